@@ -1,68 +1,116 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.exc import StaleDataError
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_current_user
+from sqlalchemy import event
 import sys
 
 # Assuming these are correct imports from your project:
-from models import db, Flight, Booking, User
-from pricing import calculate_dynamic_price 
+from models import db, Flight, Booking, User, ArchivedPnr, add_missing_columns
+from core import configure_database
+from pricing import calculate_dynamic_price, calculate_group_price, GROUP_MAX_SIZE
+from seatmap import seat_maps, UNASSIGNED_SEAT
+from overbooking import sellable_seats
+from identity_cache import identity_cache
+from export import stream_export
+from archive import find_archived_booking
+from ratelimit import limiter, rate_limited
+from changelog import read_events, EVENT_TYPES, DEFAULT_BATCH_SIZE
+from concurrency import retry_on_conflict, conflict_stats
+from currency import get_currency, convert_from_inr, PRICING_CURRENCY
 
 from datetime import datetime, timedelta
 import random
 import string
 import time
-import locale 
-
-# Set locale for INR formatting (for display in dictionaries)
-try:
-    locale.setlocale(locale.LC_MONETARY, 'en_IN.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_MONETARY, 'C') 
+import hashlib
+import threading
+import os
 
 # Create the Flask app
 app = Flask(__name__)
 
 # --- Configuration ---
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///flights.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = 'super-secret-key-for-ur-flight-mate'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+# Comma-separated emails allowed to use the /api/admin endpoints
+app.config['ADMIN_EMAILS'] = {e.strip() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
 
 # --- Initialization ---
-db.init_app(app)
+configure_database(app)
 CORS(app)
 bcrypt = Bcrypt(app)
 jwt = JWTManager(app)
+limiter.init_app(app)
 
-# Helper function to format INR cleanly (e.G., 1,00,000)
-def format_inr(amount):
-    """Formats an integer amount as Indian Rupee string (e.g., ₹1,00,000)"""
-    return f"₹{int(amount):,}"
+# Helper function to format INR cleanly (e.g., ₹12,450)
+format_inr = get_currency(PRICING_CURRENCY).format
 
 
 @jwt.user_identity_loader
 def user_identity_lookup(user_object):
-    """Called when token is created (identity=user). Returns the ID to store."""
-    return user_object.id
+    """Called when token is created (identity=user). Returns the ID to store (JWT subjects must be strings)."""
+    return str(user_object.id)
+
+
+@jwt.user_lookup_loader
+def user_lookup_callback(_jwt_header, jwt_data):
+    """Called on every protected request. Serves the user from the identity cache."""
+    return identity_cache.get(int(jwt_data["sub"]), lambda user_id: db.session.get(User, user_id))
+
+
+@jwt.user_lookup_error_loader
+def user_lookup_error_callback(_jwt_header, _jwt_data):
+    return jsonify({"error": "User not found for this token. Please re-login."}), 401
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def record_changed_user(_mapper, _connection, target):
+    """Remember the changed user id at flush time; the cache is only evicted once the change commits."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def evict_committed_users(session):
+    """Drop the cached identities of users changed by the committed transaction."""
+    for user_id in session.info.pop('changed_user_ids', ()):
+        identity_cache.evict(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_user_ids', None)
 
 
 # --- Helper Functions ---
 
 def generate_pnr():
     """Generates a random 6-character PNR."""
-    chars = string.ascii_uppercase + string.digits
-    while True:
-        pnr = ''.join(random.choice(chars) for _ in range(6))
-        # Check if this PNR already exists
-        if not Booking.query.filter_by(pnr=pnr).first():
-            return pnr # Return the unique PNR
+    return generate_pnrs(1)[0]
 
-def flight_to_dict(flight):
+def generate_pnrs(count):
+    """Generates `count` distinct unused PNRs, checking candidates in one query per round."""
+    chars = string.ascii_uppercase + string.digits
+    pnrs = []
+    while len(pnrs) < count:
+        candidates = {''.join(random.choice(chars) for _ in range(6)) for _ in range(count - len(pnrs))}
+        candidates -= set(pnrs)
+        # Drop any candidate that already exists, live or archived
+        existing = {b.pnr for b in Booking.query.filter(Booking.pnr.in_(candidates))}
+        existing |= {a.pnr for a in ArchivedPnr.query.filter(ArchivedPnr.pnr.in_(candidates))}
+        pnrs.extend(candidates - existing)
+    return pnrs
+
+def flight_to_dict(flight, price_breakdown=None):
     """Converts a Flight object to a dictionary for JSON response."""
-    price_breakdown = calculate_dynamic_price(flight)
+    price_breakdown = price_breakdown or calculate_dynamic_price(flight)
     final_price_raw = price_breakdown['final_price_inr']
     base_price_raw = price_breakdown['base_price_inr']
     
@@ -77,7 +125,8 @@ def flight_to_dict(flight):
         "dynamic_price_formatted": format_inr(final_price_raw), 
         "base_price_inr_raw": base_price_raw, 
         "dynamic_price_raw": final_price_raw,
-        "seats_available": flight.seats_available,
+        "seats_available": max(flight.seats_available, 0),
+        "seats_sellable": max(sellable_seats(flight), 0),
         "price_breakdown": {
             'base_price_inr': base_price_raw,
             'surcharges': price_breakdown['surcharges']
@@ -102,42 +151,116 @@ def booking_to_dict(booking):
         "departure_time": booking.flight.departure_time.isoformat(),
     }
 
-def generate_and_add_flight(origin, destination, date_str):
+# --- On-Demand Flight Generation ---
+
+# Number of departures created when an empty route/date is first searched.
+GENERATED_FLIGHTS_PER_DAY = 3
+
+# One lock per (origin, destination, date): concurrent searches for the same
+# empty route wait for a single generation instead of each inserting flights.
+_generation_locks = {}
+_generation_locks_guard = threading.Lock()
+
+def _acquire_generation_lock(key):
+    with _generation_locks_guard:
+        lock = _generation_locks.setdefault(key, threading.Lock())
+    lock.acquire()
+    return lock
+
+def _release_generation_lock(key, lock):
+    with _generation_locks_guard:
+        if _generation_locks.get(key) is lock:
+            del _generation_locks[key]
+    lock.release()
+
+def _route_random(origin, destination, flight_date):
+    """Returns a Random seeded by route + date so every worker builds the same schedule."""
+    seed_text = f"{origin.strip().lower()}|{destination.strip().lower()}|{flight_date.isoformat()}"
+    seed = int.from_bytes(hashlib.sha256(seed_text.encode('utf-8')).digest()[:8], 'big')
+    return random.Random(seed)
+
+def flights_on_date(origin, destination, flight_date):
+    """Query for flights on a route departing on the given date, cheapest first."""
+    return Flight.query.filter(
+        Flight.origin.ilike(f"%{origin}%"),
+        Flight.destination.ilike(f"%{destination}%"),
+        db.func.date(Flight.departure_time) == flight_date
+    ).order_by(Flight.base_price)
+
+def build_flight_schedule(origin, destination, flight_date, count=GENERATED_FLIGHTS_PER_DAY):
+    """Builds (without saving) a deterministic day's schedule for a route."""
+    rng = _route_random(origin, destination, flight_date)
+    total_seats = 150
+    flights = []
+    used_numbers = set()
+
+    # Spread departures across the 09:00-17:30 window without duplicates.
+    slots = rng.sample([(h, m) for h in range(9, 18) for m in (0, 30)], count)
+    for dep_hour, dep_minute in sorted(slots):
+        departure_dt = datetime(flight_date.year, flight_date.month, flight_date.day, dep_hour, dep_minute, 0)
+        duration_hours = rng.randint(3, 6)
+        arrival_dt = departure_dt + timedelta(hours=duration_hours, minutes=rng.randint(0, 59))
+        base_price = round(200 + duration_hours * 50 + rng.randint(10, 50), 2)
+
+        flight_num = f"{rng.choice(['UR', 'FM', 'FL'])}{rng.randint(1000, 9999)}"
+        while flight_num in used_numbers:
+            flight_num = f"{rng.choice(['UR', 'FM', 'FL'])}{rng.randint(1000, 9999)}"
+        used_numbers.add(flight_num)
+
+        flights.append(Flight(
+            flight_number=flight_num,
+            origin=origin,
+            destination=destination,
+            departure_time=departure_dt,
+            arrival_time=arrival_dt,
+            base_price=base_price,
+            total_seats=total_seats,
+            seats_available=total_seats
+        ))
+
+    # Re-roll any number already taken by another route, still from the same seed.
+    taken = {f.flight_number for f in Flight.query.filter(Flight.flight_number.in_(used_numbers))}
+    for flight in flights:
+        if flight.flight_number not in taken:
+            continue
+        while flight.flight_number in taken or flight.flight_number in used_numbers:
+            flight.flight_number = f"{rng.choice(['UR', 'FM', 'FL'])}{rng.randint(10000, 99999)}"
+        used_numbers.add(flight.flight_number)
+
+    return flights
+
+def generate_flight_schedule(origin, destination, date_str):
+    """
+    Generates and saves a day's schedule for a route that has no flights.
+    Single-flight per (route, date): concurrent callers wait on one generation
+    and then read its result. Returns the flights for the date (possibly empty).
+    """
     try:
         search_date = datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
-        return None 
+        return []
 
     if search_date < datetime.now().date():
         search_date = datetime.now().date() + timedelta(days=1)
-    
-    dep_hour = random.randint(9, 17)
-    dep_minute = random.choice([0, 30])
-    departure_dt = datetime(search_date.year, search_date.month, search_date.day, dep_hour, dep_minute, 0)
-    duration_hours = random.randint(3, 6)
-    arrival_dt = departure_dt + timedelta(hours=duration_hours, minutes=random.randint(0, 59))
-    base_price = round(200 + duration_hours * 50 + random.randint(10, 50), 2)
-    total_seats = 150
-    
-    # FIX for unique flight number
-    flight_num = f"{random.choice(['UR', 'FM', 'FL'])}{random.randint(100, 999)}"
-    if Flight.query.filter_by(flight_number=flight_num).first():
-        flight_num = f"{random.choice(['UR', 'FM', 'FL'])}{random.randint(1000, 9999)}"
-
-    new_flight = Flight(
-        flight_number=flight_num,
-        origin=origin,
-        destination=destination,
-        departure_time=departure_dt,
-        arrival_time=arrival_dt,
-        base_price=base_price, 
-        total_seats=total_seats,
-        seats_available=total_seats
-    )
-    
-    db.session.add(new_flight)
-    db.session.commit()
-    return new_flight
+
+    key = (origin.strip().lower(), destination.strip().lower(), search_date)
+    lock = _acquire_generation_lock(key)
+    try:
+        # Another request may have generated the schedule while we waited.
+        existing = flights_on_date(origin, destination, search_date).all()
+        if existing:
+            return existing
+
+        db.session.add_all(build_flight_schedule(origin, destination, search_date))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker process inserted the same seeded schedule first.
+            db.session.rollback()
+
+        return flights_on_date(origin, destination, search_date).all()
+    finally:
+        _release_generation_lock(key, lock)
 
 
 # --- Core Routes ---
@@ -148,6 +271,7 @@ def home():
 
 
 @app.route('/api/flights/search', methods=['GET'])
+@rate_limited('search')
 def search_flights():
     try:
         origin = request.args.get('origin')
@@ -162,23 +286,31 @@ def search_flights():
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
 
-        query = Flight.query.filter(
-            Flight.origin.ilike(f"%{origin}%"),
-            Flight.destination.ilike(f"%{destination}%"),
-            db.func.date(Flight.departure_time) == search_date
-        )
+        # Display currency for the quotes; fares are always charged in INR
+        currency = request.args.get('currency', PRICING_CURRENCY).upper()
+        try:
+            get_currency(currency)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        flights_list = query.order_by(Flight.base_price).all()
+        flights_list = flights_on_date(origin, destination, search_date).all()
 
-        if not flights_list:
-            new_flight = generate_and_add_flight(origin, destination, date_str)
-            if new_flight:
-                flights_list.append(new_flight)
+        # Background prefetches (?prefetch=1) only read; they never create a schedule
+        if not flights_list and not request.args.get('prefetch', type=int):
+            flights_list = generate_flight_schedule(origin, destination, date_str)
         
         if not flights_list:
              return jsonify({"message": "No flights found"}), 404
 
-        results = [flight_to_dict(f) for f in flights_list]
+        breakdowns = [calculate_dynamic_price(f) for f in flights_list]
+        results = [flight_to_dict(f, b) for f, b in zip(flights_list, breakdowns)]
+
+        prices, formatted = convert_from_inr([b['final_price_inr'] for b in breakdowns], currency)
+        for result, price, price_formatted in zip(results, prices, formatted):
+            result['currency'] = currency
+            result['display_price'] = price
+            result['display_price_formatted'] = price_formatted
+
         return jsonify(results), 200
 
     except Exception as e:
@@ -186,9 +318,43 @@ def search_flights():
         return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
 
 
+@app.route('/api/flights/<int:flight_id>/seatmap', methods=['GET'])
+@rate_limited('search')
+def get_seat_map(flight_id):
+    """
+    Returns the flight's seat bitmap (base64, bit set = seat taken) with its
+    cabin layout. Pass ?since=<version> to receive only the seats changed
+    after a version the client already holds, when still available.
+    """
+    try:
+        flight = Flight.query.get(flight_id)
+        if not flight:
+            return jsonify({"error": "Flight not found"}), 404
+
+        seat_map = seat_maps.get(flight)
+        since = request.args.get('since', type=int)
+        if since is not None:
+            changes = seat_map.changes_since(since)
+            if changes is not None:
+                return jsonify({
+                    "flight_id": flight.id,
+                    "version": seat_map.version,
+                    "changes": changes,
+                    "seats_available": max(flight.seats_available, 0)
+                }), 200
+
+        result = seat_map.to_dict()
+        result["seats_available"] = max(flight.seats_available, 0)
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+
 # --- Authentication Routes ---
 
 @app.route('/api/auth/signup', methods=['POST'])
+@rate_limited('auth')
 def signup():
     data = request.get_json()
     name = data.get('name')
@@ -217,6 +383,7 @@ def signup():
 
 
 @app.route('/api/auth/login', methods=['POST'])
+@rate_limited('auth')
 def login():
     data = request.get_json()
     email = data.get('email')
@@ -239,19 +406,19 @@ def login():
 
 @app.route('/api/bookings/create', methods=['POST'])
 @jwt_required()
+@rate_limited('booking')
+@retry_on_conflict('booking')
 def create_booking():
-    user_id = get_jwt_identity() 
-    user = User.query.get(user_id) 
-
-    if not user:
-        return jsonify({"error": "User not found for this token. Please re-login."}), 401
+    user = get_current_user()
 
     data = request.get_json()
     flight_id = data.get('flight_id')
     seat_number = data.get('seat_number')
 
-    if not all([flight_id, seat_number]):
+    if not flight_id:
         return jsonify({"error": "Missing flight_id or seat_number"}), 400
+    if seat_number is not None and not isinstance(seat_number, str):
+        return jsonify({"error": "seat_number must be a string like '12C'"}), 400
 
     try:
         flight = Flight.query.get(flight_id)
@@ -259,9 +426,21 @@ def create_booking():
         if not flight:
             return jsonify({"error": "Flight not found"}), 404
         
-        if flight.seats_available <= 0:
+        if sellable_seats(flight) <= 0:
             return jsonify({"error": "Flight is fully booked"}), 409
 
+        # Private copy; saved with a version check below and cached only after commit
+        seat_map = seat_maps.checkout(flight)
+        if flight.seats_available <= 0:
+            # Every physical seat is sold: book against the overbooking allowance, seated at check-in
+            seat_number = UNASSIGNED_SEAT
+        elif not seat_number:
+            return jsonify({"error": "Missing flight_id or seat_number"}), 400
+        elif not seat_map.is_valid(seat_number):
+            return jsonify({"error": f"Seat {seat_number} does not exist on this flight"}), 400
+        elif not seat_map.take(seat_number):
+            return jsonify({"error": f"Seat {seat_number} is already taken"}), 409
+
         flight.seats_available -= 1
         
         price_breakdown_data = calculate_dynamic_price(flight)
@@ -281,13 +460,18 @@ def create_booking():
         )
 
         db.session.add(new_booking)
+        seat_maps.save(seat_map)
         db.session.commit()
+        seat_maps.publish(seat_map)
         
         return jsonify({
             "message": "Booking successful!",
             "booking": booking_to_dict(new_booking)
         }), 201
 
+    except StaleDataError:
+        db.session.rollback()
+        raise  # Retried by @retry_on_conflict
     except IntegrityError as e:
         db.session.rollback()
         print(f"\n--- DATABASE INTEGRITY FAILURE (Likely PNR collision) ---\n{e}\n", file=sys.stderr)
@@ -298,10 +482,126 @@ def create_booking():
         return jsonify({"error": "Booking failed due to an internal server error."}), 500
 
 
+@app.route('/api/bookings/group', methods=['POST'])
+@jwt_required()
+@rate_limited('booking')
+@retry_on_conflict('group_booking')
+def create_group_booking():
+    """
+    Books several passengers on one flight in a single transaction.
+    Seats are allocated all-or-nothing and the group is priced once
+    (see pricing.calculate_group_price). If no passenger names a seat,
+    the group is seated together in adjacent seats where possible.
+    """
+    user = get_current_user()
+
+    data = request.get_json()
+    flight_id = data.get('flight_id')
+    passengers = data.get('passengers')
+
+    if not flight_id or not passengers or not isinstance(passengers, list):
+        return jsonify({"error": "Missing flight_id or passengers"}), 400
+    if len(passengers) > GROUP_MAX_SIZE:
+        return jsonify({"error": f"A group booking can have at most {GROUP_MAX_SIZE} passengers"}), 400
+
+    if not all(isinstance(p, dict) for p in passengers):
+        return jsonify({"error": "Each passenger must be an object"}), 400
+    seat_numbers = [p.get('seat_number') for p in passengers]
+    if not all(seat is None or isinstance(seat, str) for seat in seat_numbers):
+        return jsonify({"error": "seat_number must be a string like '12C'"}), 400
+    auto_assign = not any(seat_numbers)
+    if not all(p.get('passenger_name') for p in passengers):
+        return jsonify({"error": "Each passenger needs a passenger_name"}), 400
+    if not auto_assign and not all(seat_numbers):
+        return jsonify({"error": "Give a seat_number for every passenger or for none"}), 400
+    if len(set(seat_numbers)) != len(seat_numbers) and not auto_assign:
+        return jsonify({"error": "Duplicate seat numbers in request"}), 400
+
+    try:
+        flight = Flight.query.get(flight_id)
+
+        if not flight:
+            return jsonify({"error": "Flight not found"}), 404
+
+        if sellable_seats(flight) < len(passengers):
+            return jsonify({"error": f"Only {max(sellable_seats(flight), 0)} seat(s) left on this flight"}), 409
+
+        seat_map = seat_maps.checkout(flight)
+        if auto_assign:
+            # Physical seats first (together where possible); passengers beyond
+            # them use the overbooking allowance and are seated at check-in.
+            physical = min(len(passengers), max(flight.seats_available, 0))
+            assigned = seat_map.find_adjacent(physical) or seat_map.free_seats()[:physical]
+            if len(assigned) < physical:
+                return jsonify({"error": "Not enough unassigned seats left on this flight"}), 409
+            seat_numbers = assigned + [UNASSIGNED_SEAT] * (len(passengers) - physical)
+        else:
+            assigned = seat_numbers
+
+        invalid = [seat for seat in assigned if not seat_map.is_valid(seat)]
+        if invalid:
+            return jsonify({"error": "Some seats do not exist on this flight", "invalid_seats": invalid}), 400
+        if not seat_map.take_all(assigned):
+            taken = [seat for seat in assigned if seat_map.is_taken(seat)]
+            return jsonify({"error": "Some seats are already taken", "taken_seats": sorted(taken)}), 409
+
+        # Price once at the occupancy of the group's first seat, then take the rest.
+        flight.seats_available -= 1
+        price_breakdown_data = calculate_dynamic_price(flight)
+        flight.seats_available -= len(passengers) - 1
+
+        group_price = calculate_group_price(price_breakdown_data['final_price_inr'], len(passengers))
+        pnr_codes = generate_pnrs(len(passengers))
+
+        new_bookings = [
+            Booking(
+                user_id=user.id,
+                flight_id=flight.id,
+                passenger_name=passenger['passenger_name'],
+                passenger_email=passenger.get('passenger_email') or user.email,
+                pnr=pnr_code,
+                seat_number=seat_number,
+                price_paid=group_price['fare_per_passenger_inr'],
+                status='CONFIRMED'
+            )
+            for passenger, seat_number, pnr_code in zip(passengers, seat_numbers, pnr_codes)
+        ]
+
+        db.session.add_all(new_bookings)
+        seat_maps.save(seat_map)
+        db.session.commit()
+        seat_maps.publish(seat_map)
+
+        return jsonify({
+            "message": "Group booking successful!",
+            "group": {
+                "passenger_count": group_price['group_size'],
+                "fare_per_passenger": format_inr(group_price['fare_per_passenger_inr']),
+                "group_discount": format_inr(group_price['group_discount_inr']),
+                "total_price": format_inr(group_price['total_price_inr']),
+                "total_price_raw": group_price['total_price_inr']
+            },
+            "bookings": [booking_to_dict(b) for b in new_bookings]
+        }), 201
+
+    except StaleDataError:
+        db.session.rollback()
+        raise  # Retried by @retry_on_conflict
+    except IntegrityError as e:
+        db.session.rollback()
+        print(f"\n--- GROUP BOOKING INTEGRITY FAILURE ---\n{e}\n", file=sys.stderr)
+        return jsonify({"error": "Booking failed due to a database conflict. Please try again."}), 500
+    except Exception as e:
+        db.session.rollback()
+        print(f"\n--- GROUP BOOKING TRANSACTION FAILED (Unknown Error) ---\n{e}\n", file=sys.stderr)
+        return jsonify({"error": "Booking failed due to an internal server error."}), 500
+
+
 @app.route('/api/bookings/my-bookings', methods=['GET'])
 @jwt_required()
+@rate_limited('account')
 def get_user_bookings():
-    user_id = get_jwt_identity()
+    user_id = get_current_user().id
     
     try:
         bookings = Booking.query.filter_by(user_id=user_id).all()
@@ -318,11 +618,15 @@ def get_user_bookings():
 
 @app.route('/api/bookings/<pnr>', methods=['GET'])
 @jwt_required()
+@rate_limited('account')
 def get_booking_by_pnr(pnr):
-    user_id = get_jwt_identity()
+    user_id = get_current_user().id
     
     try:
         booking = Booking.query.filter_by(pnr=pnr, user_id=user_id).first()
+        if not booking:
+            # Departed flights are moved out of the hot tables; read through the archive.
+            booking = find_archived_booking(pnr, user_id)
         if not booking:
             return jsonify({"error": "Booking not found or access denied."}), 404
         return jsonify(booking_to_dict(booking)), 200
@@ -333,8 +637,10 @@ def get_booking_by_pnr(pnr):
 
 @app.route('/api/bookings/<pnr>/cancel', methods=['POST'])
 @jwt_required()
+@rate_limited('booking')
+@retry_on_conflict('cancel')
 def cancel_booking(pnr):
-    user_id = get_jwt_identity()
+    user_id = get_current_user().id
 
     try:
         booking = Booking.query.filter_by(pnr=pnr, user_id=user_id).first()
@@ -350,19 +656,156 @@ def cancel_booking(pnr):
 
         booking.status = 'CANCELLED'
         flight.seats_available += 1
+        seat_map = seat_maps.checkout(flight)
+        seat_map.release(booking.seat_number)
+        seat_maps.save(seat_map)
         db.session.commit()
+        seat_maps.publish(seat_map)
 
         return jsonify({"message": "Booking successfully cancelled."}), 200
 
+    except StaleDataError:
+        db.session.rollback()
+        raise  # Retried by @retry_on_conflict
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Cancellation failed: {str(e)}"}), 500
+
+
+CANCEL_BATCH_MAX_SIZE = 50
+
+@app.route('/api/bookings/cancel-batch', methods=['POST'])
+@jwt_required()
+@rate_limited('booking')
+@retry_on_conflict('cancel_batch')
+def cancel_bookings_batch():
+    """Cancels several of the user's bookings at once; all succeed or none do."""
+    user_id = get_current_user().id
+
+    data = request.get_json()
+    pnrs = data.get('pnrs')
+    if not pnrs or not isinstance(pnrs, list):
+        return jsonify({"error": "Missing pnrs"}), 400
+    if len(pnrs) > CANCEL_BATCH_MAX_SIZE:
+        return jsonify({"error": f"At most {CANCEL_BATCH_MAX_SIZE} bookings can be cancelled at once"}), 400
+    if not all(isinstance(pnr, str) for pnr in pnrs):
+        return jsonify({"error": "Each PNR must be a string"}), 400
+    pnrs = list(dict.fromkeys(pnrs))
+
+    try:
+        bookings = Booking.query.filter(Booking.pnr.in_(pnrs), Booking.user_id == user_id).all()
+
+        missing = set(pnrs) - {b.pnr for b in bookings}
+        if missing:
+            return jsonify({"error": "Booking not found or access denied.", "pnrs": sorted(missing)}), 404
+        cancelled = [b.pnr for b in bookings if b.status == 'CANCELLED']
+        if cancelled:
+            return jsonify({"error": "Some bookings are already cancelled.", "pnrs": sorted(cancelled)}), 409
+
+        seats_released = {}
+        for booking in bookings:
+            booking.status = 'CANCELLED'
+            seats_released[booking.flight_id] = seats_released.get(booking.flight_id, 0) + 1
+
+        flights = {f.id: f for f in Flight.query.filter(Flight.id.in_(seats_released)).all()}
+        for flight in flights.values():
+            flight.seats_available += seats_released[flight.id]
+        checked_out = {flight_id: seat_maps.checkout(flight) for flight_id, flight in flights.items()}
+        for booking in bookings:
+            checked_out[booking.flight_id].release(booking.seat_number)
+        for seat_map in checked_out.values():
+            seat_maps.save(seat_map)
+        db.session.commit()
+        for seat_map in checked_out.values():
+            seat_maps.publish(seat_map)
+
+        return jsonify({"message": f"{len(bookings)} booking(s) successfully cancelled."}), 200
+
+    except StaleDataError:
+        db.session.rollback()
+        raise  # Retried by @retry_on_conflict
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Cancellation failed: {str(e)}"}), 500
 
 
+# --- Admin Routes ---
+
+@app.route('/api/admin/export', methods=['GET'])
+@jwt_required()
+@rate_limited('account')
+def export_data():
+    """
+    Streams bookings (joined with their flight) or flights as CSV or Parquet.
+    Query params: dataset=bookings|flights, format=csv|parquet, start, end
+    (YYYY-MM-DD), origin, destination.
+    """
+    user = get_current_user()
+    if user.email not in app.config['ADMIN_EMAILS']:
+        return jsonify({"error": "Admin access required."}), 403
+
+    dataset = request.args.get('dataset', 'bookings')
+    fmt = request.args.get('format', 'csv')
+    filters = {key: request.args.get(key) for key in ('start', 'end', 'origin', 'destination')}
+
+    try:
+        chunks = stream_export(dataset, fmt, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/vnd.apache.parquet'
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@app.route('/api/admin/events', methods=['GET'])
+@jwt_required()
+@rate_limited('account')
+def get_change_events():
+    """
+    Change event log from an offset, oldest first. Query params: after
+    (last offset seen, default 0), limit, types (comma-separated). Pass the
+    returned next_offset as `after` to continue.
+    """
+    user = get_current_user()
+    if user.email not in app.config['ADMIN_EMAILS']:
+        return jsonify({"error": "Admin access required."}), 403
+
+    try:
+        after = int(request.args.get('after', 0))
+        limit = min(max(int(request.args.get('limit', DEFAULT_BATCH_SIZE)), 1), 5000)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers."}), 400
+
+    types = [t for t in request.args.get('types', '').split(',') if t]
+    unknown = set(types) - set(EVENT_TYPES)
+    if unknown:
+        return jsonify({"error": f"Unknown event types: {', '.join(sorted(unknown))}"}), 400
+
+    events, next_offset = read_events(after, limit, types or None)
+    return jsonify({"events": events, "next_offset": next_offset}), 200
+
+# --- Monitoring ---
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """In-process cache, rate-limit and write-conflict counters for monitoring."""
+    return jsonify({
+        "identity_cache": identity_cache.stats(),
+        "rate_limits": limiter.stats(),
+        "write_conflicts": conflict_stats.stats()
+    }), 200
+
+
 # --- Run App ---
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        add_missing_columns(db.engine)
     
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -2,11 +2,100 @@ import streamlit as st
 import requests
 from datetime import datetime, timedelta
 import json, os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # ----------------------------------------------------
 # --- CONFIGURATION ---
 # ----------------------------------------------------
 FLASK_API_URL = "http://127.0.0.1:5000"
+SEARCH_CACHE_TTL = 60  # Seconds a search result is reused
+PREFETCH_DAY_OFFSETS = (-1, 1)  # Dates fetched in the background around each search
+
+
+# ----------------------------------------------------
+# --- HTTP CLIENT & SEARCH CACHE ---
+# ----------------------------------------------------
+# Adjacent dates are prefetched in the background after each search. How
+# prefetches interact with the API and its rate limit is described under
+# "Cached Search with Prefetch" in README.md.
+class PrefetchStore:
+    """Results fetched in the background, kept until used or expired."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def put(self, key, results):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, results)
+
+    def take(self, key):
+        with self._lock:
+            expires, results = self._results.pop(key, (0, None))
+        return results if expires > time.monotonic() else None
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+@st.cache_resource
+def get_http_session():
+    """One pooled requests.Session per server process, so calls reuse connections."""
+    return requests.Session()
+
+
+@st.cache_resource
+def get_prefetch_pool():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-prefetch")
+
+
+@st.cache_resource
+def get_prefetch_store():
+    return PrefetchStore(SEARCH_CACHE_TTL)
+
+
+def fetch_search(session, origin, destination, date_str, prefetch=False):
+    """Calls the search API. Returns the flights ([] if none); other errors raise."""
+    params = {"origin": origin, "destination": destination, "date": date_str}
+    if prefetch:
+        params["prefetch"] = 1
+    response = session.get(f"{FLASK_API_URL}/api/flights/search", params=params)
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=SEARCH_CACHE_TTL, show_spinner=False)
+def search_flights(origin, destination, date_str):
+    """Search results for a route and date ([] if none). Errors raise and are not cached."""
+    prefetched = get_prefetch_store().take((origin, destination, date_str))
+    if prefetched is not None:
+        return prefetched
+    return fetch_search(get_http_session(), origin, destination, date_str)
+
+
+def _prefetch(session, store, origin, destination, date_str):
+    # Runs on a pool thread without a Streamlit script context: no st.* calls here.
+    try:
+        results = fetch_search(session, origin, destination, date_str, prefetch=True)
+    except requests.RequestException:
+        return
+    if results:
+        store.put((origin, destination, date_str), results)
+
+
+def prefetch_adjacent_dates(origin, destination, travel_date, min_date):
+    """Fetches the days around travel_date in the background, for search_flights to pick up."""
+    session, store, pool = get_http_session(), get_prefetch_store(), get_prefetch_pool()
+    for offset in PREFETCH_DAY_OFFSETS:
+        day = travel_date + timedelta(days=offset)
+        if day >= min_date:
+            pool.submit(_prefetch, session, store, origin, destination, day.strftime('%Y-%m-%d'))
 
 
 # ----------------------------------------------------
@@ -82,7 +171,7 @@ def show_auth_form():
 
         if submit_button:
             if st.session_state.auth_mode == 'login':
-                response = requests.post(
+                response = get_http_session().post(
                     f"{FLASK_API_URL}/api/auth/login", 
                     json={"email": email, "password": password}
                 )
@@ -106,7 +195,7 @@ def show_auth_form():
                     st.error("Login failed. Check email and password.")
 
             elif st.session_state.auth_mode == 'signup':
-                response = requests.post(
+                response = get_http_session().post(
                     f"{FLASK_API_URL}/api/auth/signup", 
                     json={"name": email, "email": email, "password": password}
                 )
@@ -147,22 +236,15 @@ def show_flight_search():
         submit_search = st.form_submit_button("Search Flights")
 
     if submit_search and origin and destination:
-        params = {
-            "origin": origin,
-            "destination": destination,
-            "date": travel_date.strftime('%Y-%m-%d')
-        }
-
-        search_response = requests.get(
-            f"{FLASK_API_URL}/api/flights/search", 
-            params=params
-        )
-
-        if search_response.status_code == 200:
-            st.session_state.search_results = search_response.json()
+        try:
+            st.session_state.search_results = search_flights(origin, destination, travel_date.strftime('%Y-%m-%d'))
+        except requests.RequestException:
+            st.session_state.search_results = []
+
+        if st.session_state.search_results:
+            prefetch_adjacent_dates(origin, destination, travel_date, min_date)
         else:
             st.error("No flights found for this route.")
-            st.session_state.search_results = []
 
     if st.session_state.search_results:
         st.subheader(f"Results for {origin} to {destination}")
@@ -235,7 +317,7 @@ def show_booking_page():
                 "seat_number": seat_number,
             }
 
-            booking_response = requests.post(
+            booking_response = get_http_session().post(
                 f"{FLASK_API_URL}/api/bookings/create", 
                 json=booking_payload, 
                 headers=auth_headers
@@ -244,6 +326,8 @@ def show_booking_page():
             if booking_response.status_code == 201:
                 booking_data = booking_response.json().get('booking', {})
                 st.session_state.last_booking_pnr = booking_data.get('pnr')
+                search_flights.clear()  # Cached prices and availability are now out of date
+                get_prefetch_store().clear()
                 st.session_state.current_view = 'search'
                 st.rerun()
             else:
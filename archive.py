@@ -0,0 +1,196 @@
+"""
+Archiving of departed flights and their bookings.
+
+Flights that departed before a cutoff are moved, with their bookings, out
+of the hot tables into one SQLite file per departure month
+(<instance>/archive/flights_YYYY_MM.db). Every archived PNR is recorded in
+the archived_pnr index in the main database, so get_booking_by_pnr can
+still find it. Run nightly:
+
+    python archive.py --days 1
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import Column, MetaData, Table, create_engine, inspect
+
+from models import db, Flight, Booking, FlightSeatMap, ArchivedPnr, add_missing_columns
+from seatmap import seat_maps
+
+ARCHIVE_AFTER_DAYS = 1
+ARCHIVE_BATCH_SIZE = 500
+
+
+
+def _archive_table(table, metadata):
+    """
+    Archive copy of a hot table: same columns, but only the primary key is
+    unique. Flight numbers are reused by later departures, so a UNIQUE
+    flight_number would make INSERT OR REPLACE delete the earlier flight.
+    Formerly unique columns keep a plain index for lookups.
+    """
+    columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, index=bool(c.unique) or None)
+               for c in table.columns]
+    return Table(table.name, metadata, *columns)
+
+
+_archive_metadata = MetaData()
+_ARCHIVED_TABLES = [_archive_table(Flight.__table__, _archive_metadata),
+                    _archive_table(Booking.__table__, _archive_metadata)]
+_archived_flight, _archived_booking = _ARCHIVED_TABLES
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def archive_dir():
+    return current_app.config.get('ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archive')
+
+
+def partition_for(departure_time):
+    """Partition key ('YYYY-MM') for a departure time."""
+    return departure_time.strftime('%Y-%m')
+
+
+def _archive_engine(partition, create=False):
+    """Engine for a month's archive file, or None if it does not exist and create is False."""
+    path = os.path.join(archive_dir(), f"flights_{partition.replace('-', '_')}.db")
+    with _engines_lock:
+        engine = _engines.get(path)
+        if engine is not None:
+            return engine
+        if not create and not os.path.exists(path):
+            return None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        engine = create_engine(f"sqlite:///{path}")
+        _archive_metadata.create_all(engine)
+        add_missing_columns(engine, [Flight.__table__, Booking.__table__])  # The hot tables carry the column defaults
+        _drop_unique_constraints(engine)
+        _engines[path] = engine
+        return engine
+
+
+def _drop_unique_constraints(engine):
+    """Rebuilds tables of archive files created with the hot tables' UNIQUE constraints (SQLite cannot drop them)."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in _ARCHIVED_TABLES:
+            if not inspector.get_unique_constraints(table.name):
+                continue
+            names = ', '.join(c.name for c in table.columns)
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {table.name}_old")
+            table.create(conn)
+            conn.exec_driver_sql(f"INSERT INTO {table.name} ({names}) SELECT {names} FROM {table.name}_old")
+            conn.exec_driver_sql(f"DROP TABLE {table.name}_old")
+
+
+def _archive_partition(partition, flight_ids):
+    """Copies flights and their bookings into the partition file, then removes them from the hot tables."""
+    flight_table, booking_table = Flight.__table__, Booking.__table__
+
+    flight_rows = db.session.execute(
+        db.select(flight_table).where(flight_table.c.id.in_(flight_ids))
+    ).mappings().all()
+    booking_rows = db.session.execute(
+        db.select(booking_table).where(booking_table.c.flight_id.in_(flight_ids))
+    ).mappings().all()
+
+    # INSERT OR REPLACE on the id keeps a re-run after a crash between the two commits idempotent.
+    with _archive_engine(partition, create=True).begin() as conn:
+        conn.execute(_archived_flight.insert().prefix_with('OR REPLACE'), [dict(r) for r in flight_rows])
+        if booking_rows:
+            conn.execute(_archived_booking.insert().prefix_with('OR REPLACE'), [dict(r) for r in booking_rows])
+
+    for row in booking_rows:
+        db.session.merge(ArchivedPnr(pnr=row['pnr'], user_id=row['user_id'], partition=partition))
+    db.session.execute(db.delete(FlightSeatMap).where(FlightSeatMap.flight_id.in_(flight_ids)))
+    db.session.execute(db.delete(Booking).where(Booking.flight_id.in_(flight_ids)))
+    db.session.execute(db.delete(Flight).where(Flight.id.in_(flight_ids)))
+    db.session.commit()
+    for flight_id in flight_ids:
+        seat_maps.evict(flight_id)
+
+    return len(flight_rows), len(booking_rows)
+
+
+def archive_departed_flights(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Moves flights that departed more than `older_than_days` ago, with their
+    bookings, into monthly archive files. Returns counts per partition.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    summary = {}
+
+    while True:
+        batch = db.session.execute(
+            db.select(Flight.id, Flight.departure_time)
+            .where(Flight.departure_time < cutoff)
+            .order_by(Flight.departure_time)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+
+        by_partition = {}
+        for flight_id, departure_time in batch:
+            by_partition.setdefault(partition_for(departure_time), []).append(flight_id)
+
+        for partition, flight_ids in by_partition.items():
+            flights, bookings = _archive_partition(partition, flight_ids)
+            totals = summary.setdefault(partition, {'flights': 0, 'bookings': 0})
+            totals['flights'] += flights
+            totals['bookings'] += bookings
+
+    return summary
+
+
+def find_archived_booking(pnr, user_id):
+    """
+    Read-through lookup of an archived booking via the PNR index. Returns a
+    detached Booking with its Flight attached, or None if either is missing.
+    """
+    entry = ArchivedPnr.query.filter_by(pnr=pnr, user_id=user_id).first()
+    if not entry:
+        return None
+
+    engine = _archive_engine(entry.partition)
+    if engine is None:
+        return None
+
+    with engine.connect() as conn:
+        booking_row = conn.execute(
+            db.select(_archived_booking).where(_archived_booking.c.pnr == pnr)
+        ).mappings().first()
+        if booking_row is None:
+            return None
+        flight_row = conn.execute(
+            db.select(_archived_flight).where(_archived_flight.c.id == booking_row['flight_id'])
+        ).mappings().first()
+    if flight_row is None:
+        return None
+
+    # Transient objects (never added to the session) so booking_to_dict works unchanged.
+    booking = Booking(**booking_row)
+    booking.flight = Flight(**flight_row)
+    return booking
+
+
+if __name__ == '__main__':
+    import argparse
+    from core import create_core_app
+
+    parser = argparse.ArgumentParser(description="Archive departed flights and their bookings by month.")
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="Archive flights that departed more than this many days ago")
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with create_core_app().app_context():
+        result = archive_departed_flights(args.days, args.batch_size)
+        if not result:
+            print("Nothing to archive.")
+        for partition, counts in sorted(result.items()):
+            print(f"{partition}: archived {counts['flights']} flight(s), {counts['bookings']} booking(s)")
@@ -0,0 +1,228 @@
+"""
+Offline backtester for pricing policies.
+
+Replays a booking event log against one or more pricing policies in
+simulated time. The clock advances in ticks. Within a tick every flight
+is priced in one vectorized call from its inventory at the start of the
+tick. A request is accepted if the customer's willingness to pay covers
+the price and seats remain, taking requests first-come within each flight.
+
+A policy is any callable
+    policy(base_price_usd, seats_sold, authorized_seats, days_until_departure) -> prices_inr
+working on NumPy arrays. The built-in policies are listed in POLICIES.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from pricing import calculate_dynamic_prices, reference_fares, INR_RATE
+from overbooking import authorized_capacity, authorized_capacity_for
+
+# Flights as parallel arrays; departure_hours is measured on the event clock.
+FlightSet = namedtuple('FlightSet', ['flight_number', 'base_price_usd', 'total_seats', 'authorized_seats', 'departure_hours'])
+# One booking request per entry.
+EventLog = namedtuple('EventLog', ['time_hours', 'flight_idx', 'party_size', 'willingness_to_pay_inr'])
+
+DEFAULT_TICK_HOURS = 1.0
+
+
+# --- Policies ---
+
+def current_policy(base_price_usd, seats_sold, authorized_seats, days_until_departure):
+    """The live pricing.calculate_dynamic_price curve."""
+    return calculate_dynamic_prices(base_price_usd, seats_sold, authorized_seats, days_until_departure)
+
+
+def flat_policy(base_price_usd, seats_sold, authorized_seats, days_until_departure):
+    """Base fare plus the class premium, no dynamic surcharges."""
+    return reference_fares(base_price_usd)
+
+
+POLICIES = {
+    'current': current_policy,
+    'flat': flat_policy,
+}
+
+
+# --- Event Logs ---
+
+def synthetic_flights(n_flights, horizon_days=90, total_seats=150, seed=None):
+    """Random flights departing uniformly over the horizon."""
+    rng = np.random.default_rng(seed)
+    seats = np.full(n_flights, total_seats, dtype=np.int64)
+    return FlightSet(
+        flight_number=np.array([f"SIM{i:06d}" for i in range(n_flights)]),
+        base_price_usd=np.round(rng.uniform(250, 600, n_flights), 2),
+        total_seats=seats,
+        authorized_seats=np.full(n_flights, authorized_capacity_for(total_seats), dtype=np.int64),
+        departure_hours=rng.uniform(24 * 7, 24 * horizon_days, n_flights),
+    )
+
+
+def synthetic_events(flights, n_events, mean_lead_days=20.0, seed=None):
+    """
+    Booking requests with exponential lead times before departure and a
+    log-normal willingness to pay around 1.3x the flight's base fare.
+    """
+    rng = np.random.default_rng(seed)
+    flight_idx = rng.integers(0, len(flights.base_price_usd), n_events)
+    lead_hours = rng.exponential(mean_lead_days * 24, n_events)
+    time_hours = np.maximum(flights.departure_hours[flight_idx] - lead_hours, 0.0)
+    base_price_inr = flights.base_price_usd[flight_idx] * INR_RATE
+    return EventLog(
+        time_hours=time_hours,
+        flight_idx=flight_idx,
+        party_size=rng.integers(1, 4, n_events),
+        willingness_to_pay_inr=base_price_inr * rng.lognormal(np.log(1.3), 0.35, n_events),
+    )
+
+
+def recorded_events():
+    """
+    Builds a flight set and event log from the bookings in the database.
+    The recorded price_paid is used as the customer's willingness to pay,
+    a conservative lower bound. Needs an app context.
+    """
+    from models import Flight, Booking
+
+    flights = Flight.query.order_by(Flight.id).all()
+    bookings = Booking.query.order_by(Booking.booking_time).all()
+    if not flights or not bookings:
+        raise ValueError("No recorded flights or bookings to replay")
+
+    start = min(b.booking_time for b in bookings)
+    to_hours = lambda dt: (dt - start).total_seconds() / 3600.0
+    position = {f.id: i for i, f in enumerate(flights)}
+
+    flight_set = FlightSet(
+        flight_number=np.array([f.flight_number for f in flights]),
+        base_price_usd=np.array([f.base_price for f in flights], dtype=float),
+        total_seats=np.array([f.total_seats for f in flights], dtype=np.int64),
+        authorized_seats=np.array([authorized_capacity(f) for f in flights], dtype=np.int64),
+        departure_hours=np.array([to_hours(f.departure_time) for f in flights]),
+    )
+    events = EventLog(
+        time_hours=np.array([to_hours(b.booking_time) for b in bookings]),
+        flight_idx=np.array([position[b.flight_id] for b in bookings], dtype=np.int64),
+        party_size=np.ones(len(bookings), dtype=np.int64),
+        willingness_to_pay_inr=np.array([b.price_paid for b in bookings], dtype=float),
+    )
+    return flight_set, events
+
+
+# --- Replay ---
+
+def _group_cumsum(keys, values):
+    """Cumulative sum of values restarting at every new key (keys must be sorted)."""
+    totals = np.cumsum(values)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    offsets = np.repeat(totals[starts] - values[starts], np.diff(np.r_[starts, len(keys)]))
+    return totals - offsets
+
+
+def run_policy(flights, events, policy, tick_hours=DEFAULT_TICK_HOURS, track_flights=None):
+    """
+    Replays events against one policy. Returns revenue, load factor (seats
+    sold over physical seats, above 1.0 when overbooked) and the price path
+    (price at every tick with events) of the tracked flights.
+    """
+    n_flights = len(flights.base_price_usd)
+    if track_flights is None:
+        track_flights = np.arange(min(n_flights, 10))
+    track_flights = np.asarray(track_flights, dtype=np.int64)
+
+    order = np.argsort(events.time_hours, kind='stable')
+    ev_time = events.time_hours[order]
+    ev_flight = events.flight_idx[order]
+    ev_size = events.party_size[order]
+    ev_wtp = events.willingness_to_pay_inr[order]
+
+    ticks = np.floor(ev_time / tick_hours).astype(np.int64)
+    tick_values, tick_starts = np.unique(ticks, return_index=True)
+    tick_ends = np.r_[tick_starts[1:], len(ticks)]
+
+    seats_sold = np.zeros(n_flights, dtype=np.int64)
+    revenue = 0.0
+    bookings = 0
+    path_prices = np.empty((len(tick_values), len(track_flights)))
+
+    for i, (tick, lo, hi) in enumerate(zip(tick_values, tick_starts, tick_ends)):
+        now = tick * tick_hours
+        f = ev_flight[lo:hi]
+
+        days_left = np.floor((flights.departure_hours[f] - now) / 24.0)
+        prices = policy(flights.base_price_usd[f], seats_sold[f], flights.authorized_seats[f], days_left)
+
+        wants = (ev_wtp[lo:hi] >= prices) & (flights.departure_hours[f] > ev_time[lo:hi])
+        idx = np.flatnonzero(wants)
+        if len(idx):
+            # First-come within each flight until its remaining capacity is used up.
+            by_flight = idx[np.argsort(f[idx], kind='stable')]
+            claimed = _group_cumsum(f[by_flight], ev_size[lo:hi][by_flight])
+            remaining = flights.authorized_seats[f[by_flight]] - seats_sold[f[by_flight]]
+            accepted = by_flight[claimed <= remaining]
+
+            sizes = ev_size[lo:hi][accepted]
+            revenue += float(np.sum(prices[accepted] * sizes))
+            bookings += len(accepted)
+            seats_sold += np.bincount(f[accepted], weights=sizes, minlength=n_flights).astype(np.int64)
+
+        tracked = track_flights
+        path_prices[i] = policy(
+            flights.base_price_usd[tracked], seats_sold[tracked], flights.authorized_seats[tracked],
+            np.floor((flights.departure_hours[tracked] - now) / 24.0)
+        )
+
+    return {
+        'revenue_inr': revenue,
+        'bookings': bookings,
+        'seats_sold': int(seats_sold.sum()),
+        'load_factor': float(seats_sold.sum() / flights.total_seats.sum()),
+        'seats_sold_per_flight': seats_sold,
+        'price_path': {
+            'time_hours': tick_values * tick_hours,
+            'flight_numbers': flights.flight_number[track_flights],
+            'prices_inr': path_prices,
+        },
+    }
+
+
+def backtest(flights, events, policies, tick_hours=DEFAULT_TICK_HOURS, track_flights=None):
+    """Runs every policy ({name: callable}) over the same events. Returns {name: report}."""
+    return {
+        name: run_policy(flights, events, policy, tick_hours=tick_hours, track_flights=track_flights)
+        for name, policy in policies.items()
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest pricing policies against booking events.")
+    parser.add_argument('--policies', default='current,flat', help="Comma-separated names from POLICIES")
+    parser.add_argument('--recorded', action='store_true', help="Replay bookings from flights.db")
+    parser.add_argument('--flights', type=int, default=2000, help="Synthetic flights")
+    parser.add_argument('--events', type=int, default=1000000, help="Synthetic booking requests")
+    parser.add_argument('--tick-hours', type=float, default=DEFAULT_TICK_HOURS)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.recorded:
+        from core import create_core_app
+        with create_core_app().app_context():
+            flight_set, event_log = recorded_events()
+    else:
+        flight_set = synthetic_flights(args.flights, seed=args.seed)
+        event_log = synthetic_events(flight_set, args.events, seed=args.seed)
+
+    selected = {name: POLICIES[name] for name in args.policies.split(',')}
+    print(f"Replaying {len(event_log.time_hours):,} events on {len(flight_set.base_price_usd):,} flights...")
+
+    for name, policy in selected.items():
+        started = time.perf_counter()
+        report = run_policy(flight_set, event_log, policy, tick_hours=args.tick_hours)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>10}: revenue ₹{report['revenue_inr']:,.0f} | "
+              f"bookings {report['bookings']:,} | load factor {report['load_factor']:.1%} | "
+              f"{elapsed:.1f}s")
@@ -0,0 +1,41 @@
+"""
+Startup-time benchmark: how long a fresh Python process takes to get ready
+when it imports the full web app versus the lightweight core.
+
+    python bench_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = [
+    ("full web app (import app)", "import app"),
+    ("core app + models", "import core; core.create_core_app()"),
+    ("core pricing only", "from core import calculate_dynamic_price"),
+    ("bare interpreter", "pass"),
+]
+
+
+def time_case(code, runs):
+    """Median and best wall time (seconds) of `runs` fresh interpreters running `code`."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=here, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), min(samples)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare process startup cost of app.py and core.py.")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'case':<30} {'median':>9} {'best':>9}")
+    for label, code in CASES:
+        median, best = time_case(code, args.runs)
+        print(f"{label:<30} {median * 1000:>7.0f}ms {best * 1000:>7.0f}ms")
@@ -0,0 +1,152 @@
+"""
+Change-data-capture event log for inventory and bookings.
+
+A session listener turns every flushed change into rows of the
+change_event table, inserted on the flush's own connection. Events
+therefore commit or roll back with the change that caused them. Event
+types:
+
+    flight_created     a new Flight row
+    inventory_changed  Flight.seats_available changed (bookings, cancellations, simulator)
+    booking_created    a new Booking row
+    booking_cancelled  Booking.status changed to CANCELLED
+
+Only inventory_changed events carry a non-zero seats_delta. Booking
+events record which passenger and seat changed, and the inventory change
+they cause arrives as a separate inventory_changed event from the same
+flush. A group booking therefore gives one booking_created per passenger
+and a single inventory_changed of -N. Summing seats_delta over all events
+gives the net inventory change.
+
+The event id is a monotonically increasing offset. Consumers keep the last
+offset they processed and call read_events(after=offset) or tail() to get
+what happened since, in batches.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, Flight, Booking, ChangeEvent
+
+DEFAULT_BATCH_SIZE = 500
+EVENT_TYPES = ('flight_created', 'inventory_changed', 'booking_created', 'booking_cancelled')
+
+
+def _event(event_type, flight_id, now, pnr=None, seats_delta=0, seats_available=None, data=None):
+    return {
+        'event_type': event_type,
+        'flight_id': flight_id,
+        'pnr': pnr,
+        'seats_delta': seats_delta,
+        'seats_available': seats_available,
+        'data': data,
+        'created_at': now,
+    }
+
+
+def _collect_events(session):
+    now = datetime.utcnow()
+    events = []
+
+    for obj in session.new:
+        if isinstance(obj, Flight):
+            events.append(_event('flight_created', obj.id, now, seats_available=obj.seats_available, data={
+                'flight_number': obj.flight_number,
+                'origin': obj.origin,
+                'destination': obj.destination,
+                'departure_time': obj.departure_time.isoformat(),
+                'total_seats': obj.total_seats,
+                'base_price': obj.base_price,
+            }))
+        elif isinstance(obj, Booking):
+            events.append(_event('booking_created', obj.flight_id, now, pnr=obj.pnr, data={
+                'user_id': obj.user_id,
+                'seat_number': obj.seat_number,
+                'price_paid': obj.price_paid,
+            }))
+
+    for obj in session.dirty:
+        if isinstance(obj, Flight):
+            history = inspect(obj).attrs.seats_available.history
+            if history.added and history.deleted:
+                delta = history.added[0] - history.deleted[0]
+                if delta:
+                    events.append(_event('inventory_changed', obj.id, now, seats_delta=delta,
+                                         seats_available=history.added[0]))
+        elif isinstance(obj, Booking):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.added[0] == 'CANCELLED' and history.deleted != ['CANCELLED']:
+                events.append(_event('booking_cancelled', obj.flight_id, now, pnr=obj.pnr, data={
+                    'user_id': obj.user_id,
+                    'seat_number': obj.seat_number,
+                }))
+
+    return events
+
+
+@event.listens_for(Session, 'after_flush')
+def record_change_events(session, _flush_context):
+    """Writes the flush's change events on the same connection, inside the same transaction."""
+    events = _collect_events(session)
+    if events:
+        session.connection().execute(ChangeEvent.__table__.insert(), events)
+
+
+def event_to_dict(row):
+    return {
+        'offset': row.id,
+        'event_type': row.event_type,
+        'flight_id': row.flight_id,
+        'pnr': row.pnr,
+        'seats_delta': row.seats_delta,
+        'seats_available': row.seats_available,
+        'data': row.data,
+        'created_at': row.created_at.isoformat(),
+    }
+
+
+def read_events(after=0, limit=DEFAULT_BATCH_SIZE, event_types=None):
+    """
+    Events with offset > `after`, oldest first, at most `limit` of them.
+    Returns (events, next_offset); pass next_offset back as `after`.
+    """
+    query = ChangeEvent.query.filter(ChangeEvent.id > after)
+    if event_types:
+        query = query.filter(ChangeEvent.event_type.in_(event_types))
+    rows = query.order_by(ChangeEvent.id).limit(limit).all()
+    events = [event_to_dict(row) for row in rows]
+    return events, (events[-1]['offset'] if events else after)
+
+
+def tail(after=0, batch_size=DEFAULT_BATCH_SIZE, poll_interval=1.0, event_types=None):
+    """Yields batches of new events forever, polling when caught up. Needs an app context."""
+    while True:
+        events, after = read_events(after, batch_size, event_types)
+        if events:
+            yield events
+        else:
+            db.session.rollback()  # End the read transaction so the next poll sees new commits
+            time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from core import create_core_app
+
+    parser = argparse.ArgumentParser(description="Tail the change event log.")
+    parser.add_argument('--after', type=int, default=0, help="Start after this offset")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--types', help="Comma-separated event types to include")
+    args = parser.parse_args()
+
+    with create_core_app().app_context():
+        types = args.types.split(',') if args.types else None
+        try:
+            for batch in tail(args.after, args.batch_size, event_types=types):
+                for item in batch:
+                    print(json.dumps(item))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,80 @@
+"""
+Retry for optimistic-locking conflicts.
+
+Flight and Booking carry a version_id column (see models.py). When two
+transactions read the same row and both write it, the second UPDATE
+matches no row and SQLAlchemy raises StaleDataError. No lock is held
+while a request prices or allocates seats.
+
+Routes wrapped in @retry_on_conflict(...) are re-run from the start
+with jittered exponential backoff: they reload the rows and decide again
+against fresh data. A route must roll back before re-raising
+StaleDataError. There is nothing else to undo: seat maps are changed on a
+private checkout copy (see seatmap.SeatMapStore), and the shared copy is
+only updated after commit. If every attempt conflicts, the client gets a
+409 it can safely retry.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+from sqlalchemy.orm.exc import StaleDataError
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.01  # Seconds before the first retry; doubles on each attempt
+BACKOFF_MAX = 0.2
+
+
+class ConflictStats:
+    """Per-operation counters of conflicts, retries and exhausted retries."""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def count(self, operation, outcome):
+        with self._lock:
+            key = (operation, outcome)
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            counters = {}
+            for (operation, outcome), value in self._counters.items():
+                counters.setdefault(operation, {})[outcome] = value
+        return counters
+
+
+conflict_stats = ConflictStats()
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry (1-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+
+def retry_on_conflict(operation, max_attempts=MAX_ATTEMPTS):
+    """Re-runs the view when it raises StaleDataError, up to max_attempts times."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    result = fn(*args, **kwargs)
+                except StaleDataError:
+                    conflict_stats.count(operation, 'conflicts')
+                    if attempt == max_attempts:
+                        break
+                    conflict_stats.count(operation, 'retries')
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                if attempt > 1:
+                    conflict_stats.count(operation, 'resolved_after_retry')
+                return result
+
+            conflict_stats.count(operation, 'exhausted')
+            return jsonify({"error": "The flight was updated by another request. Please try again."}), 409
+        return wrapper
+    return decorator
@@ -0,0 +1,72 @@
+"""
+Lightweight core: database models and pricing without the web stack.
+
+Scripts that only need the database or the pricing engine (seed.py,
+demand_simulator.py, dashboard.py and the CLIs) use this module instead
+of importing app.py, which also loads CORS, Bcrypt, JWT, the rate limiter
+and every route. Names are imported on first use, so
+`from core import calculate_dynamic_price` never loads Flask or SQLAlchemy.
+Database access still imports Flask, SQLAlchemy and Flask-SQLAlchemy,
+which take most of app.py's import time, so create_core_app() starts
+about as slowly as the web app (see bench_startup.py).
+
+    from core import create_core_app, db, Flight
+
+    app = create_core_app()
+    with app.app_context():
+        Flight.query.count()
+"""
+import importlib
+
+DATABASE_URI = 'sqlite:///flights.db'
+
+# Public name -> module it is loaded from on first access
+_LAZY_ATTRIBUTES = {
+    'db': 'models',
+    'Flight': 'models',
+    'Booking': 'models',
+    'User': 'models',
+    'FlightSeatMap': 'models',
+    'ArchivedPnr': 'models',
+    'ChangeEvent': 'models',
+    'add_missing_columns': 'models',
+    'calculate_dynamic_price': 'pricing',
+    'calculate_dynamic_prices': 'pricing',
+    'calculate_group_price': 'pricing',
+    'sellable_seats': 'overbooking',
+    'effective_occupancy': 'overbooking',
+    'authorized_capacity': 'overbooking',
+}
+
+__all__ = ['DATABASE_URI', 'configure_database', 'create_core_app'] + list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module 'core' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def configure_database(app):
+    """
+    Points an app at the flights database and binds the shared SQLAlchemy
+    instance. Also registers the change event log listener, so every
+    writer (web app or script) records its changes.
+    """
+    from models import db
+    import changelog  # noqa: F401
+
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', DATABASE_URI)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+
+def create_core_app():
+    """A bare Flask app with only the database configured, for scripts and batch jobs."""
+    from flask import Flask
+
+    app = Flask(__name__)
+    configure_database(app)
+    return app
@@ -0,0 +1,77 @@
+"""
+Currency conversion and formatting for price quotes.
+
+Exchange rates and display rules come from a local JSON file (fx_rates.json
+next to this module, or the FX_RATES_FILE environment variable). Rates are
+units of each currency per unit of the base currency (USD, the currency of
+Flight.base_price). Fares are priced and charged in INR (see pricing.py).
+Other currencies are for display only and are converted from the INR price.
+
+The file is read once per process, and pricing.INR_RATE and app.format_inr
+are bound at import, so new rates take effect on restart. Each currency's
+converter (rate, rounding and formatter) is built on first use and cached,
+so no per-row parsing or locale lookup happens while formatting a result set.
+
+    eur = get_currency('EUR')
+    eur.format(eur.from_inr(12450))      # '€138.00'
+    convert_from_inr([12450, 9800], 'EUR')
+"""
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+FX_RATES_FILE = os.environ.get('FX_RATES_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fx_rates.json')
+PRICING_CURRENCY = 'INR'
+
+Currency = namedtuple('Currency', ['code', 'symbol', 'decimals', 'usd_rate', 'from_inr', 'format'])
+
+
+@lru_cache(maxsize=1)
+def load_fx_table(path=None):
+    """The parsed FX file: {'base': 'USD', 'rates': {...}, 'formats': {...}}."""
+    with open(path or FX_RATES_FILE, encoding='utf-8') as f:
+        table = json.load(f)
+    if PRICING_CURRENCY not in table['rates']:
+        raise ValueError(f"FX table must have a rate for {PRICING_CURRENCY}")
+    return table
+
+
+def supported_currencies():
+    return sorted(load_fx_table()['rates'])
+
+
+def usd_rate(code):
+    """Units of `code` per US dollar."""
+    rates = load_fx_table()['rates']
+    if code not in rates:
+        raise ValueError(f"Unsupported currency: {code}")
+    return float(rates[code])
+
+
+@lru_cache(maxsize=None)
+def get_currency(code):
+    """Converter and formatter for a currency, built once per process."""
+    code = code.upper()
+    rate = usd_rate(code)
+    spec = load_fx_table().get('formats', {}).get(code, {})
+    symbol = spec.get('symbol', f"{code} ")
+    decimals = int(spec.get('decimals', 2))
+
+    inr_to_target = rate / usd_rate(PRICING_CURRENCY)
+    template = f"{symbol}{{:,.{decimals}f}}"
+    if decimals == 0:
+        def from_inr(amount_inr):
+            return int(round(amount_inr * inr_to_target))
+    else:
+        def from_inr(amount_inr):
+            return round(amount_inr * inr_to_target, decimals)
+
+    return Currency(code, symbol, decimals, rate, from_inr, template.format)
+
+
+def convert_from_inr(amounts_inr, code):
+    """Converts a whole result set of INR amounts at once. Returns (amounts, formatted strings)."""
+    currency = get_currency(code)
+    amounts = [currency.from_inr(a) for a in amounts_inr]
+    return amounts, [currency.format(a) for a in amounts]
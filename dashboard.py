@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from app import app, db, Flight, calculate_dynamic_price
+from core import create_core_app, db, Flight, calculate_dynamic_price, effective_occupancy
 from datetime import datetime, timedelta
 import random
 import time # Ensure this is imported for any simulator loops, though we won't use it now.
@@ -24,6 +24,13 @@ st.set_page_config(
     initial_sidebar_state="expanded" 
 )
 
+# Build the database-only app once per server process, not on every rerun.
+@st.cache_resource
+def get_core_app():
+    return create_core_app()
+
+app = get_core_app()
+
 # -----------------------------------------------------------
 # 1. SIDEBAR LAYOUT
 # -----------------------------------------------------------
@@ -67,13 +74,16 @@ def update_dashboard():
 
             # --- CALCULATE DYNAMIC DATA (Using imported pricing logic) ---
             dynamic_price = calculate_dynamic_price(flight)
-            occupancy_pct = round(1.0 - (flight.seats_available / flight.total_seats), 2)
+            # Same occupancy pricing uses: sold vs authorized capacity (overbooking included), in [0, 1]
+            occupancy_pct = round(effective_occupancy(flight), 2)
+            # Overbooked flights go below zero; show no physical seats left instead
+            seats_available = max(flight.seats_available, 0)
             
             # CRITICAL FIX: Use accepted Streamlit keywords ('normal', 'inverse', 'off')
             seat_color_keyword = 'normal' # Default (Green/Good)
-            if flight.seats_available < 50:
+            if seats_available < 50:
                 seat_color_keyword = 'normal' 
-            if flight.seats_available < 20:
+            if seats_available < 20:
                 # Use 'inverse' to color the delta red/orange for low seats
                 seat_color_keyword = 'inverse' 
             
@@ -92,7 +102,7 @@ def update_dashboard():
                 # Seat Availability Metric Card
                 st.metric(
                     label="Seats Available",
-                    value=f"{flight.seats_available}",
+                    value=f"{seats_available}",
                     delta=f"Occupancy: {occupancy_pct*100:.0f}%",
                     delta_color=seat_color_keyword # Applies the red/orange/green color
                 )
@@ -107,7 +117,7 @@ def update_dashboard():
                     "Route": [f"{flight.origin} -> {flight.destination}"],
                     "Departure Time": [flight.departure_time.strftime("%Y-%m-%d %H:%M")],
                     "Current Price": [f"${dynamic_price:.2f}"],
-                    "Seats Remaining": [flight.seats_available],
+                    "Seats Remaining": [seats_available],
                 }
                 df = pd.DataFrame(flight_data)
                 
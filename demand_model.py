@@ -0,0 +1,45 @@
+from pricing import calculate_dynamic_prices, reference_fares
+
+# --- Demand Model Configuration ---
+# Expected seats requested per flight per tick at the reference fare, far from departure.
+BASE_SEATS_PER_TICK = 0.25
+# Constant price elasticity: demand scales with (price / reference) ** -ELASTICITY.
+PRICE_ELASTICITY = 1.8
+# Demand ramps up as departure nears: multiplier 1 + LEAD_TIME_BOOST * exp(-days / LEAD_TIME_DAYS).
+LEAD_TIME_BOOST = 2.0
+LEAD_TIME_DAYS = 7.0
+# Relative popularity per (origin, destination); routes not listed get 1.0.
+ROUTE_DEMAND = {}
+
+
+def booking_intensity(prices_inr, reference_inr, days_until_departure, route_factor,
+                      elasticity=PRICE_ELASTICITY):
+    """Expected seats requested per tick for each flight (NumPy arrays in, array out)."""
+    import numpy as np
+
+    price_ratio = np.asarray(prices_inr, dtype=float) / np.asarray(reference_inr, dtype=float)
+    days = np.maximum(np.asarray(days_until_departure, dtype=float), 0.0)
+    lead_factor = 1.0 + LEAD_TIME_BOOST * np.exp(-days / LEAD_TIME_DAYS)
+    return BASE_SEATS_PER_TICK * np.asarray(route_factor) * lead_factor * price_ratio ** -elasticity
+
+
+def simulate_tick(flights, sellable, authorized, now, rng):
+    """
+    One demand tick for all open flights at once. Prices every flight with
+    the live pricing curve, draws Poisson seat requests from the
+    price-dependent intensity and caps them at the seats still sellable.
+    Returns (seats booked per flight, price per flight), both arrays.
+    """
+    import numpy as np
+
+    base_price_usd = np.array([f.base_price for f in flights], dtype=float)
+    total_seats = np.array([f.total_seats for f in flights], dtype=np.int64)
+    seats_available = np.array([f.seats_available for f in flights], dtype=np.int64)
+    days = np.array([(f.departure_time - now).days for f in flights])
+    route_factor = np.array([ROUTE_DEMAND.get((f.origin, f.destination), 1.0) for f in flights])
+
+    prices = calculate_dynamic_prices(base_price_usd, total_seats - seats_available, authorized, days)
+    intensity = booking_intensity(prices, reference_fares(base_price_usd), days, route_factor)
+    requested = rng.poisson(intensity)
+    return np.minimum(requested, np.maximum(sellable, 0)), prices
+
@@ -1,46 +1,75 @@
 import time
 import random
-from app import app, db, Flight
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm.exc import StaleDataError
+
+from core import create_core_app, db, Flight, sellable_seats, authorized_capacity
+from demand_model import simulate_tick
+from seatmap import seat_maps
 
 def simulate_demand():
     """
-    A background script that will randomly 'book' seats to
-    simulate real-world demand.
+    A background script that 'books' seats to simulate real-world demand.
+    Every tick, booking demand for all open flights is drawn at once from
+    the price-elastic model in demand_model.py, so higher dynamic prices
+    sell fewer seats.
     """
     print("--- Demand Simulator Started ---")
     print("Press Ctrl+C to stop the simulator.")
+    app = create_core_app()
+    rng = np.random.default_rng()
     
     while True:
         try:
             # We need to run this 'with' block
             # to make sure our script can talk to the app and database
             with app.app_context():
+                now = datetime.now()
+
+                # 1. Find every open flight that still has seats (overbooking allowance included)
+                open_flights = [
+                    f for f in Flight.query.filter(Flight.departure_time > now).all()
+                    if sellable_seats(f) > 0
+                ]
                 
-                # 1. Find a random flight that still has seats
-                available_flights = Flight.query.filter(Flight.seats_available > 0).all()
-                
-                if not available_flights:
+                if not open_flights:
                     print("All flights are fully booked!")
                     break
-                    
-                # 2. Pick one of those flights at random
-                flight_to_book = random.choice(available_flights)
-                
-                # 3. 'Book' a random number of seats (1 to 3)
-                seats_to_book = random.randint(1, 3)
-                
-                # Make sure we don't book more seats than are left
-                if seats_to_book > flight_to_book.seats_available:
-                    seats_to_book = flight_to_book.seats_available
-                    
-                # 4. Update the database
-                flight_to_book.seats_available -= seats_to_book
-                db.session.commit()
-                
-                print(f"Booked {seats_to_book} seat(s) on Flight {flight_to_book.flight_number}.")
-                print(f"  > Flight {flight_to_book.flight_number} now has {flight_to_book.seats_available} seats left.")
 
-            # 5. Wait for a random time (e.g., 2 to 5 seconds) before booking again
+                # 2. Draw this tick's bookings for all of them at the current dynamic prices
+                sellable = np.array([sellable_seats(f) for f in open_flights])
+                authorized = np.array([authorized_capacity(f) for f in open_flights])
+                booked, prices = simulate_tick(open_flights, sellable, authorized, now, rng)
+
+                # 3. Update the database in one transaction. Seats are taken in the
+                # seat map too (beyond the physical seats they stay unassigned),
+                # so the seat map shows the flight filling up.
+                seat_map_updates = []
+                try:
+                    for flight, seats, price in zip(open_flights, booked, prices):
+                        if seats:
+                            seat_map = seat_maps.checkout(flight)
+                            physical = min(int(seats), max(flight.seats_available, 0))
+                            seat_map.take_all(seat_map.free_seats()[:physical])
+                            seat_maps.save(seat_map)
+                            seat_map_updates.append(seat_map)
+                            flight.seats_available -= int(seats)
+                            print(f"Booked {seats} seat(s) on Flight {flight.flight_number} at ₹{price:,.0f}.")
+                            print(f"  > Flight {flight.flight_number} now has {flight.seats_available} seats left.")
+                    db.session.commit()
+                except StaleDataError:
+                    # A booking or cancellation changed one of these flights mid-tick; redraw next tick.
+                    db.session.rollback()
+                    print("Tick discarded: flights were updated concurrently.")
+                else:
+                    for seat_map in seat_map_updates:
+                        seat_maps.publish(seat_map)
+                    revenue = float((booked * prices).sum())
+                    print(f"Tick: {int(booked.sum())} seat(s) on {int((booked > 0).sum())} of {len(open_flights)} open flight(s), revenue ₹{revenue:,.0f}")
+
+            # 4. Wait for a random time (e.g., 2 to 5 seconds) before the next tick
             time.sleep(random.randint(2, 5))
             
         except KeyboardInterrupt:
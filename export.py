@@ -0,0 +1,217 @@
+"""
+Streaming CSV/Parquet export of bookings and flights.
+
+Rows are read with yield_per so memory stays constant whatever the table
+size. SQLite runs in WAL mode (see models.py), so a long export does not
+block the app's writers. Used by GET /api/admin/export and as a CLI:
+
+    python export.py bookings --format csv --start 2025-11-01 --end 2025-11-30 > bookings.csv
+"""
+import csv
+import importlib.util
+import io
+from datetime import datetime, timedelta
+
+from models import db, Flight, Booking
+
+EXPORT_CHUNK_SIZE = 5000
+FORMATS = ('csv', 'parquet')
+
+BOOKING_COLUMNS = [
+    ('pnr', Booking.pnr),
+    ('status', Booking.status),
+    ('booking_time', Booking.booking_time),
+    ('price_paid_inr', Booking.price_paid),
+    ('seat_number', Booking.seat_number),
+    ('passenger_name', Booking.passenger_name),
+    ('passenger_email', Booking.passenger_email),
+    ('user_id', Booking.user_id),
+    ('flight_number', Flight.flight_number),
+    ('origin', Flight.origin),
+    ('destination', Flight.destination),
+    ('departure_time', Flight.departure_time),
+    ('arrival_time', Flight.arrival_time),
+    ('base_price_usd', Flight.base_price),
+]
+
+FLIGHT_COLUMNS = [
+    ('flight_id', Flight.id),
+    ('flight_number', Flight.flight_number),
+    ('origin', Flight.origin),
+    ('destination', Flight.destination),
+    ('departure_time', Flight.departure_time),
+    ('arrival_time', Flight.arrival_time),
+    ('base_price_usd', Flight.base_price),
+    ('total_seats', Flight.total_seats),
+    ('seats_available', Flight.seats_available),
+]
+
+DATASETS = {
+    # name: (columns, date column the start/end filter applies to)
+    'bookings': (BOOKING_COLUMNS, Booking.booking_time),
+    'flights': (FLIGHT_COLUMNS, Flight.departure_time),
+}
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def build_export_query(dataset, start=None, end=None, origin=None, destination=None):
+    """
+    Select statement for a dataset. start/end are YYYY-MM-DD strings
+    (end inclusive) applied to booking_time for bookings and
+    departure_time for flights.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'. Choose from: {', '.join(DATASETS)}")
+    columns, date_column = DATASETS[dataset]
+
+    stmt = db.select(*[column.label(name) for name, column in columns])
+    if dataset == 'bookings':
+        stmt = stmt.join(Flight, Booking.flight_id == Flight.id).order_by(Booking.id)
+    else:
+        stmt = stmt.order_by(Flight.id)
+
+    start_dt, end_dt = _parse_date(start), _parse_date(end)
+    if start_dt:
+        stmt = stmt.where(date_column >= start_dt)
+    if end_dt:
+        stmt = stmt.where(date_column < end_dt + timedelta(days=1))
+    if origin:
+        stmt = stmt.where(Flight.origin.ilike(f"%{origin}%"))
+    if destination:
+        stmt = stmt.where(Flight.destination.ilike(f"%{destination}%"))
+    return stmt
+
+
+def iter_row_chunks(stmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields lists of row tuples, holding at most one chunk in memory."""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    try:
+        for chunk in result.partitions(chunk_size):
+            yield [tuple(row) for row in chunk]
+    finally:
+        result.close()
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def stream_csv(dataset, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """Yields CSV text: a header line, then one block per chunk of rows."""
+    columns = [name for name, _ in DATASETS[dataset][0]]
+    stmt = build_export_query(dataset, **filters)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for rows in iter_row_chunks(stmt, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(pa, columns):
+    """Arrow schema from the SQLAlchemy column types, so every row group matches."""
+    arrow_types = {
+        'INTEGER': pa.int64(),
+        'FLOAT': pa.float64(),
+        'DATETIME': pa.timestamp('us'),
+    }
+    return pa.schema([
+        (name, arrow_types.get(column.type.__visit_name__.upper(), pa.string()))
+        for name, column in columns
+    ])
+
+
+def stream_parquet(dataset, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """Yields Parquet bytes, one row group per chunk. Requires pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = _arrow_schema(pa, DATASETS[dataset][0])
+    stmt = build_export_query(dataset, **filters)
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in iter_row_chunks(stmt, chunk_size):
+        arrays = [pa.array(list(col), type=field.type) for col, field in zip(zip(*rows), schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(dataset, fmt='csv', chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """Generator for an export in the requested format (validates arguments eagerly)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    build_export_query(dataset, **filters)
+    if fmt == 'parquet':
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+        return stream_parquet(dataset, chunk_size, **filters)
+    return stream_csv(dataset, chunk_size, **filters)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Stream bookings or flights as CSV or Parquet.")
+    parser.add_argument('dataset', choices=list(DATASETS))
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--out', help="Output file (default: stdout)")
+    parser.add_argument('--start', help="YYYY-MM-DD, inclusive")
+    parser.add_argument('--end', help="YYYY-MM-DD, inclusive")
+    parser.add_argument('--origin')
+    parser.add_argument('--destination')
+    parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from core import create_core_app
+
+    with create_core_app().app_context():
+        chunks = stream_export(
+            args.dataset, args.format, args.chunk_size,
+            start=args.start, end=args.end, origin=args.origin, destination=args.destination
+        )
+        binary = args.format == 'parquet'
+        if args.out:
+            out = open(args.out, 'wb' if binary else 'w', newline='' if not binary else None)
+        else:
+            out = sys.stdout.buffer if binary else sys.stdout
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.out:
+                out.close()
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# What protected routes need to know about the caller, detached from any DB session.
+CachedUser = namedtuple('CachedUser', ['id', 'name', 'email'])
+
+
+class IdentityCache:
+    """
+    Thread-safe TTL + LRU cache of users keyed on user id.
+    Entries are evicted explicitly when the user row changes.
+    """
+
+    def __init__(self, ttl_seconds=300, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id, loader):
+        """Returns the cached user, calling loader(user_id) on a miss (None is not cached)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        user = loader(user_id)
+        if user is None:
+            return None
+
+        cached = CachedUser(user.id, user.name, user.email)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl_seconds, cached)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def evict(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+identity_cache = IdentityCache()
@@ -1,9 +1,43 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
 from datetime import datetime
+import sqlite3
 
 # Initialize SQLAlchemy outside of the app setup
 db = SQLAlchemy()
 
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_wal(dbapi_connection, _connection_record):
+    """WAL lets long reads (exports, dashboards) run without blocking writers."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+def add_missing_columns(engine, tables=None):
+    """
+    Adds columns introduced since a SQLite file was created (create_all only
+    creates missing tables). New columns must have a scalar default.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in tables or db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if default is not None:
+                    ddl += f" NOT NULL DEFAULT {default!r}"
+                conn.exec_driver_sql(ddl)
+
+
 # --- User Model ---
 class User(db.Model):
     __tablename__ = 'user'
@@ -18,6 +52,8 @@ class User(db.Model):
 # --- Flight Model ---
 class Flight(db.Model):
     __tablename__ = 'flight'
+    # Never reuse ids of archived rows (see archive.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     flight_number = db.Column(db.String(20), nullable=False, unique=True)
     origin = db.Column(db.String(100), nullable=False)
@@ -28,11 +64,50 @@ class Flight(db.Model):
     # Pricing/Inventory
     base_price = db.Column(db.Float, nullable=False) # Base price in USD
     total_seats = db.Column(db.Integer, nullable=False)
+    # Goes below zero when a flight is overbooked (see overbooking.authorized_capacity)
     seats_available = db.Column(db.Integer, nullable=False)
 
+    # Optimistic locking: updates fail with StaleDataError if the row changed since it was read
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    __mapper_args__ = {'version_id_col': version_id}
+
+# --- Seat Map Model ---
+class FlightSeatMap(db.Model):
+    __tablename__ = 'flight_seat_map'
+    flight_id = db.Column(db.Integer, db.ForeignKey('flight.id'), primary_key=True)
+
+    # One bit per seat (1 = taken), see seatmap.SeatMap for the encoding
+    bitmap = db.Column(db.LargeBinary, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# --- Archived PNR Index ---
+# Points each archived booking at the monthly archive file holding it (see archive.py)
+class ArchivedPnr(db.Model):
+    __tablename__ = 'archived_pnr'
+    pnr = db.Column(db.String(6), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    partition = db.Column(db.String(7), nullable=False) # 'YYYY-MM'
+
+# --- Change Event Log ---
+# Append-only log of inventory and booking changes, written in the same
+# transaction as the change (see changelog.py). The id is the offset.
+class ChangeEvent(db.Model):
+    __tablename__ = 'change_event'
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(30), nullable=False)
+    flight_id = db.Column(db.Integer, nullable=False, index=True)
+    pnr = db.Column(db.String(6))
+    seats_delta = db.Column(db.Integer, default=0, nullable=False)
+    seats_available = db.Column(db.Integer)
+    data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 # --- Booking Model (Required for Booking Logic) ---
 class Booking(db.Model):
     __tablename__ = 'booking'
+    # Never reuse ids of archived rows (see archive.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Keys
@@ -48,5 +123,9 @@ class Booking(db.Model):
     status = db.Column(db.String(20), default='CONFIRMED', nullable=False)
     booking_time = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Optimistic locking, as on Flight
+    version_id = db.Column(db.Integer, nullable=False, default=1)
+    __mapper_args__ = {'version_id_col': version_id}
+
     # Relationship to Flight details
     flight = db.relationship('Flight', backref=db.backref('bookings', lazy=True))
\ No newline at end of file
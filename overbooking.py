@@ -0,0 +1,161 @@
+import math
+from functools import lru_cache
+
+# --- Overbooking Configuration ---
+# Share of booked passengers who do not turn up, unless a route overrides it.
+DEFAULT_NO_SHOW_PROBABILITY = 0.08
+# Per-route no-show rates keyed on (origin, destination).
+ROUTE_NO_SHOW_PROBABILITY = {}
+# Never sell more than this fraction above physical capacity.
+MAX_OVERBOOKING_PCT = 0.10
+# Accept at most this probability that more passengers show up than there are seats.
+DENIED_BOARDING_RISK = 0.05
+# Cost of one denied boarding (compensation + rebooking) in USD, for the simulation.
+DENIED_BOARDING_COST_USD = 400.0
+
+OVERBOOKING_ENABLED = True
+
+
+def no_show_probability(flight):
+    """No-show probability for a flight's route."""
+    return ROUTE_NO_SHOW_PROBABILITY.get((flight.origin, flight.destination), DEFAULT_NO_SHOW_PROBABILITY)
+
+
+@lru_cache(maxsize=1024)
+def _authorized_capacity(capacity, no_show_prob, risk, max_pct):
+    """
+    Largest number of bookings A such that, with each passenger showing up
+    independently with probability 1 - no_show_prob, P(show-ups > capacity) <= risk.
+    """
+    show_prob = 1.0 - no_show_prob
+    limit = capacity + int(capacity * max_pct)
+    authorized = capacity
+
+    for sold in range(capacity + 1, limit + 1):
+        # Binomial upper tail P(S > capacity) for S ~ Bin(sold, show_prob)
+        overflow_prob = sum(
+            math.comb(sold, k) * show_prob ** k * no_show_prob ** (sold - k)
+            for k in range(capacity + 1, sold + 1)
+        )
+        if overflow_prob > risk:
+            break
+        authorized = sold
+
+    return authorized
+
+
+def authorized_capacity_for(total_seats, no_show_prob=DEFAULT_NO_SHOW_PROBABILITY):
+    """Authorized capacity for a cabin size and no-show probability."""
+    if not OVERBOOKING_ENABLED or total_seats <= 0:
+        return total_seats
+    return _authorized_capacity(total_seats, no_show_prob, DENIED_BOARDING_RISK, MAX_OVERBOOKING_PCT)
+
+
+def authorized_capacity(flight):
+    """Number of seats that may be sold on a flight, including overbooking."""
+    return authorized_capacity_for(flight.total_seats, no_show_probability(flight))
+
+
+def sellable_seats(flight):
+    """Seats still sellable: physical seats left plus the overbooking allowance."""
+    return flight.seats_available + authorized_capacity(flight) - flight.total_seats
+
+
+def effective_occupancy(flight):
+    """Share of authorized capacity already sold, in [0, 1]."""
+    authorized = authorized_capacity(flight)
+    if authorized <= 0:
+        return 1.0
+    sold = flight.total_seats - flight.seats_available
+    return min(max(sold / authorized, 0.0), 1.0)
+
+
+# --- Monte-Carlo Evaluation ---
+
+def simulate_overbooking(capacity, fare, no_show_prob=DEFAULT_NO_SHOW_PROBABILITY,
+                         mean_demand=None, authorization_levels=None,
+                         denied_boarding_cost=DENIED_BOARDING_COST_USD,
+                         n_departures=10000, seed=None):
+    """
+    Simulates `n_departures` departures for each authorization level at once
+    and reports expected revenue and denied boardings per level.
+
+    Demand per departure is Poisson(mean_demand) (defaults to 1.2 x capacity),
+    bookings are capped at the authorization level, and show-ups are binomial.
+    Returns a list of dicts, one per level.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    if mean_demand is None:
+        mean_demand = capacity * 1.2
+    if authorization_levels is None:
+        authorization_levels = range(capacity, capacity + int(capacity * MAX_OVERBOOKING_PCT) + 1)
+    levels = np.asarray(list(authorization_levels))
+
+    # Shape (levels, departures): the same demand draws are reused for every level.
+    demand = rng.poisson(mean_demand, size=n_departures)
+    sold = np.minimum(demand[np.newaxis, :], levels[:, np.newaxis])
+    shows = rng.binomial(sold, 1.0 - no_show_prob)
+    denied = np.maximum(shows - capacity, 0)
+    boarded = shows - denied
+    revenue = sold * fare - denied * denied_boarding_cost
+
+    return [
+        {
+            'authorized': int(level),
+            'expected_revenue': float(revenue[i].mean()),
+            'expected_denied_boardings': float(denied[i].mean()),
+            'denied_boarding_probability': float((denied[i] > 0).mean()),
+            'expected_load_factor': float(boarded[i].mean() / capacity),
+        }
+        for i, level in enumerate(levels)
+    ]
+
+
+def evaluate_flight(flight, n_departures=10000, seed=None):
+    """Monte-Carlo evaluation of a flight's overbooking levels at its base fare."""
+    results = simulate_overbooking(
+        flight.total_seats,
+        flight.base_price,
+        no_show_prob=no_show_probability(flight),
+        n_departures=n_departures,
+        seed=seed,
+    )
+    best = max(results, key=lambda r: r['expected_revenue'])
+    return {
+        'flight_number': flight.flight_number,
+        'authorized_capacity': authorized_capacity(flight),
+        'revenue_maximizing_level': best['authorized'],
+        'levels': results,
+    }
+
+
+if __name__ == '__main__':
+    # Nightly report: one line per route with the revenue-maximizing level
+    # next to the risk-based authorization currently in use.
+    import argparse
+    from datetime import datetime
+    from core import create_core_app, Flight
+
+    parser = argparse.ArgumentParser(description="Evaluate overbooking levels per route.")
+    parser.add_argument('--departures', type=int, default=10000, help="Simulated departures per level")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    with create_core_app().app_context():
+        flights = Flight.query.filter(Flight.departure_time > datetime.now()).all()
+
+        # One representative flight per route
+        routes = {}
+        for flight in flights:
+            routes.setdefault((flight.origin, flight.destination), flight)
+
+        for (origin, destination), flight in sorted(routes.items()):
+            report = evaluate_flight(flight, n_departures=args.departures, seed=args.seed)
+            chosen = next(r for r in report['levels'] if r['authorized'] == report['authorized_capacity'])
+            print(f"{origin} -> {destination} ({flight.total_seats} seats, ${flight.base_price:.2f}): "
+                  f"authorized {report['authorized_capacity']}, "
+                  f"best {report['revenue_maximizing_level']}, "
+                  f"denied/departure {chosen['expected_denied_boardings']:.3f}, "
+                  f"revenue ${chosen['expected_revenue']:,.0f}")
@@ -1,8 +1,25 @@
 from datetime import datetime
 import math # Import math for rounding/ceilings
+from overbooking import effective_occupancy
+from currency import usd_rate, PRICING_CURRENCY
 
-# Define conversion rate for simulator simplicity (e.g., 1 USD to 83 INR)
-INR_RATE = 83.0
+# USD -> INR rate used to price base fares, from the FX table (see currency.py)
+INR_RATE = usd_rate(PRICING_CURRENCY)
+
+# --- Pricing Rules ---
+# Shared by calculate_dynamic_price and calculate_dynamic_prices (backtests,
+# demand simulation), so a change here reaches both.
+OCCUPANCY_SURCHARGE_FACTOR = 0.8  # Surcharge = base * occupancy^2 * factor
+# (departure less than this many days away, surcharge rate), nearest first
+DATE_PROXIMITY_TIERS = ((2, 0.35), (7, 0.15), (30, 0.05))
+CLASS_PREMIUM_RATE = 0.10
+
+
+def date_proximity_multiplier(days_until_departure):
+    for days_limit, rate in DATE_PROXIMITY_TIERS:
+        if days_until_departure < days_limit:
+            return rate
+    return 0.0 # No surcharge for long lead times
 
 def calculate_dynamic_price(flight):
     """
@@ -23,14 +40,12 @@ def calculate_dynamic_price(flight):
     }
     
     # --- Factor 1: Seat Occupancy ---
-    try:
-        occupancy_pct = 1.0 - (flight.seats_available / flight.total_seats)
-    except ZeroDivisionError:
-        occupancy_pct = 1.0 
+    # Measured against authorized capacity (physical seats + overbooking allowance)
+    occupancy_pct = effective_occupancy(flight)
         
     # Occupancy Surcharge Calculation: Base Price * (Occupancy^2) * 0.8
     # This makes the surcharge higher than the other one to reflect scarcity
-    occupancy_multiplier = (occupancy_pct ** 2) * 0.8
+    occupancy_multiplier = (occupancy_pct ** 2) * OCCUPANCY_SURCHARGE_FACTOR
     surcharges['occupancy_surcharge'] = math.ceil(base_price_inr * occupancy_multiplier)
 
 
@@ -39,17 +54,8 @@ def calculate_dynamic_price(flight):
     time_difference = flight.departure_time - now
     days_until_departure = time_difference.days
 
-    if days_until_departure < 2:
-        # Less than 2 days away? 35% surcharge.
-        time_multiplier = 0.35
-    elif days_until_departure < 7:
-        # Less than 1 week away? 15% surcharge.
-        time_multiplier = 0.15
-    elif days_until_departure < 30:
-        # Less than 1 month away? 5% surcharge.
-        time_multiplier = 0.05
-    else:
-        time_multiplier = 0.0 # No surcharge for long lead times
+    # 35% under 2 days, 15% under a week, 5% under a month (DATE_PROXIMITY_TIERS)
+    time_multiplier = date_proximity_multiplier(days_until_departure)
         
     surcharges['date_proximity_surcharge'] = math.ceil(base_price_inr * time_multiplier)
 
@@ -57,7 +63,7 @@ def calculate_dynamic_price(flight):
     # --- Factor 3: Class Premium (Simple Placeholder) ---
     # Since we aren't tracking classes yet, we'll simulate a 10% premium 
     # to demonstrate the breakdown element.
-    surcharges['class_premium'] = math.ceil(base_price_inr * 0.10)
+    surcharges['class_premium'] = math.ceil(base_price_inr * CLASS_PREMIUM_RATE)
     
     # --- Final Calculation ---
     total_surcharge = sum(surcharges.values())
@@ -67,4 +73,66 @@ def calculate_dynamic_price(flight):
         'final_price_inr': final_dynamic_price,
         'base_price_inr': base_price_inr,
         'surcharges': surcharges
-    }
\ No newline at end of file
+    }
+
+
+def calculate_dynamic_prices(base_price_usd, seats_sold, authorized_seats, days_until_departure):
+    """
+    Vectorized calculate_dynamic_price for NumPy arrays (one entry per flight).
+    Returns final prices in INR; used by the backtester to price many flights at once.
+    """
+    import numpy as np
+
+    base_price_inr = np.ceil(np.asarray(base_price_usd, dtype=float) * INR_RATE)
+
+    authorized = np.asarray(authorized_seats, dtype=float)
+    occupancy_pct = np.where(
+        authorized > 0,
+        np.clip(np.asarray(seats_sold, dtype=float) / np.maximum(authorized, 1), 0.0, 1.0),
+        1.0
+    )
+    occupancy_surcharge = np.ceil(base_price_inr * ((occupancy_pct ** 2) * OCCUPANCY_SURCHARGE_FACTOR))
+
+    days = np.asarray(days_until_departure)
+    time_multiplier = np.select(
+        [days < days_limit for days_limit, _ in DATE_PROXIMITY_TIERS],
+        [rate for _, rate in DATE_PROXIMITY_TIERS],
+        default=0.0
+    )
+    date_proximity_surcharge = np.ceil(base_price_inr * time_multiplier)
+
+    class_premium = np.ceil(base_price_inr * CLASS_PREMIUM_RATE)
+
+    return base_price_inr + occupancy_surcharge + date_proximity_surcharge + class_premium
+
+def reference_fares(base_price_usd):
+    """Base fare plus class premium with no dynamic surcharges (INR), for NumPy arrays."""
+    import numpy as np
+
+    base_price_inr = np.ceil(np.asarray(base_price_usd, dtype=float) * INR_RATE)
+    return base_price_inr + np.ceil(base_price_inr * CLASS_PREMIUM_RATE)
+
+# --- Group Pricing ---
+# A group is priced with a single evaluation: every passenger pays the fare
+# of the group's first seat, and larger groups get a flat discount on it.
+GROUP_MAX_SIZE = 9
+GROUP_DISCOUNT_MIN_SIZE = 5
+GROUP_DISCOUNT_RATE = 0.05
+
+def calculate_group_price(fare_per_passenger_inr, group_size):
+    """
+    Applies group pricing to a per-passenger fare (INR) and returns the
+    per-passenger fare, the discount and the total for the whole group.
+    """
+    discount_per_passenger = 0
+    if group_size >= GROUP_DISCOUNT_MIN_SIZE:
+        discount_per_passenger = math.floor(fare_per_passenger_inr * GROUP_DISCOUNT_RATE)
+
+    fare_after_discount = fare_per_passenger_inr - discount_per_passenger
+
+    return {
+        'group_size': group_size,
+        'fare_per_passenger_inr': fare_after_discount,
+        'group_discount_inr': discount_per_passenger * group_size,
+        'total_price_inr': fare_after_discount * group_size
+    }
@@ -0,0 +1,251 @@
+"""
+Token-bucket rate limiting and load-shedding admission control.
+
+Every route is tagged with an endpoint class via @rate_limited(...). Each
+(client, class) pair gets a token bucket: clients are the JWT user where
+one is present, otherwise the remote address. Bucket state lives in
+process memory by default. Setting RATE_LIMIT_STORAGE to
+'sqlite:///path/to/file.db' shares it between worker processes on one host,
+standing in for a shared store such as Redis.
+
+Low-priority classes (search) are also subject to admission control: when
+the recent booking latency rises above BOOKING_LATENCY_TARGET_MS, only a
+few low-priority requests are let through at a time. The rest wait briefly
+for a slot and are rejected with 503 if none frees up.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+# endpoint class: (tokens per second, burst size)
+DEFAULT_RATE_LIMITS = {
+    'search': (5.0, 20),
+    'booking': (1.0, 10),
+    'account': (5.0, 20),
+    'auth': (0.5, 5),
+}
+LOW_PRIORITY_CLASSES = {'search'}
+
+BOOKING_LATENCY_TARGET_MS = 500
+LOW_PRIORITY_SLOTS_WHEN_OVERLOADED = 2
+ADMISSION_QUEUE_TIMEOUT = 0.5  # Seconds a low-priority request waits for a slot
+LATENCY_SMOOTHING = 0.2  # Weight of the newest sample in the latency EWMA
+LATENCY_SAMPLE_TTL = 10.0  # Seconds without bookings after which the EWMA no longer counts
+
+MAX_MEMORY_BUCKETS = 100000
+BUCKET_PRUNE_INTERVAL = 60.0  # Seconds between sweeps for buckets that have refilled
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in an LRU dict; shared by the threads of one process.
+    A bucket that has refilled to its burst is the same as no bucket, so
+    those are swept out periodically. Past max_buckets the least recently
+    used bucket is dropped, which gives that client a full bucket again.
+    """
+
+    def __init__(self, max_buckets=MAX_MEMORY_BUCKETS, prune_interval=BUCKET_PRUNE_INTERVAL):
+        self.max_buckets = max_buckets
+        self.prune_interval = prune_interval
+        self._buckets = OrderedDict()  # key -> (tokens, updated, full_at)
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, burst, now):
+        """Takes one token. Returns (allowed, seconds until a token is available)."""
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            if now >= self._next_prune:
+                self._prune(now)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rate
+
+    def _prune(self, now):
+        for key in [k for k, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+        self._next_prune = now + self.prune_interval
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, rate, burst, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute("INSERT OR REPLACE INTO bucket (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rate
+
+
+class AdmissionController:
+    """Sheds low-priority traffic while booking latency is above target."""
+
+    def __init__(self, target_ms=BOOKING_LATENCY_TARGET_MS, slots=LOW_PRIORITY_SLOTS_WHEN_OVERLOADED,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.target_ms = target_ms
+        self.queue_timeout = queue_timeout
+        self.booking_latency_ms = 0.0
+        self._last_sample = 0.0
+        self._slots = threading.BoundedSemaphore(slots)
+        self._lock = threading.Lock()
+
+    @property
+    def overloaded(self):
+        if time.monotonic() - self._last_sample > LATENCY_SAMPLE_TTL:
+            return False
+        return self.booking_latency_ms > self.target_ms
+
+    def record_booking_latency(self, seconds):
+        with self._lock:
+            sample = seconds * 1000.0
+            self.booking_latency_ms += LATENCY_SMOOTHING * (sample - self.booking_latency_ms)
+            self._last_sample = time.monotonic()
+
+    def try_enter(self):
+        """Returns True if a low-priority request may run now (call leave() afterwards)."""
+        return self._slots.acquire(timeout=self.queue_timeout)
+
+    def leave(self):
+        self._slots.release()
+
+
+class RateLimiter:
+    def __init__(self):
+        self.store = MemoryBucketStore()
+        self.limits = dict(DEFAULT_RATE_LIMITS)
+        self.admission = AdmissionController()
+        self.enabled = True
+        self._counters = {}
+        self._counters_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.limits.update(app.config.get('RATE_LIMITS', {}))
+        storage = app.config.get('RATE_LIMIT_STORAGE', 'memory')
+        if storage.startswith('sqlite:///'):
+            self.store = SQLiteBucketStore(storage[len('sqlite:///'):])
+        self.admission = AdmissionController(
+            target_ms=app.config.get('BOOKING_LATENCY_TARGET_MS', BOOKING_LATENCY_TARGET_MS)
+        )
+
+    def count(self, endpoint_class, outcome):
+        with self._counters_lock:
+            key = (endpoint_class, outcome)
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def stats(self):
+        with self._counters_lock:
+            counters = {}
+            for (endpoint_class, outcome), value in self._counters.items():
+                counters.setdefault(endpoint_class, {})[outcome] = value
+        return {
+            'counters': counters,
+            'booking_latency_ms': round(self.admission.booking_latency_ms, 1),
+            'overloaded': self.admission.overloaded,
+        }
+
+    def check(self, endpoint_class, client_key):
+        """Returns (allowed, retry_after). Fails open if the shared store is locked or unavailable."""
+        rate, burst = self.limits[endpoint_class]
+        try:
+            return self.store.consume(f"{endpoint_class}:{client_key}", rate, burst, time.time())
+        except sqlite3.OperationalError:
+            self.count(endpoint_class, 'store_error')
+            return True, 0.0
+
+
+limiter = RateLimiter()
+
+
+def _client_key():
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        identity = None  # Route is not behind jwt_required
+    if identity is not None:
+        return f"user:{identity}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limited(endpoint_class):
+    """
+    Applies the endpoint class's token bucket (429 when empty). Put it below
+    @jwt_required() so authenticated routes are limited per user.
+    """
+    low_priority = endpoint_class in LOW_PRIORITY_CLASSES
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not limiter.enabled:
+                return fn(*args, **kwargs)
+
+            allowed, retry_after = limiter.check(endpoint_class, _client_key())
+            if not allowed:
+                limiter.count(endpoint_class, 'throttled')
+                response = jsonify({"error": "Too many requests. Please slow down."})
+                response.headers['Retry-After'] = str(max(1, round(retry_after)))
+                return response, 429
+
+            if low_priority and limiter.admission.overloaded:
+                if not limiter.admission.try_enter():
+                    limiter.count(endpoint_class, 'shed')
+                    response = jsonify({"error": "Server is busy. Please retry shortly."})
+                    response.headers['Retry-After'] = '1'
+                    return response, 503
+                limiter.count(endpoint_class, 'queued')
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    limiter.admission.leave()
+
+            limiter.count(endpoint_class, 'allowed')
+            if endpoint_class != 'booking':
+                return fn(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                limiter.admission.record_booking_latency(time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,305 @@
+import base64
+import math
+import threading
+from collections import deque
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db, Booking, FlightSeatMap
+
+# Default cabin: single aisle, 3-3 seating (ABC | DEF).
+DEFAULT_LETTERS = 'ABCDEF'
+DEFAULT_AISLES = (3,)  # Aisle sits before the letter at this index
+
+# How many recent seat changes each map keeps for cheap client diffs.
+MAX_TRACKED_CHANGES = 256
+
+# Seat number of bookings sold from the overbooking allowance once every
+# physical seat is taken; those passengers are seated at check-in.
+UNASSIGNED_SEAT = 'UNASSIGNED'
+
+
+class CabinLayout:
+    """Row/letter layout of a cabin. Seat index = (row - 1) * len(letters) + letter position."""
+
+    def __init__(self, rows, letters=DEFAULT_LETTERS, aisles=DEFAULT_AISLES, seat_count=None):
+        self.rows = rows
+        self.letters = letters
+        self.aisles = tuple(aisles)
+        self.seat_count = seat_count if seat_count is not None else rows * len(letters)
+
+    @classmethod
+    def for_total_seats(cls, total_seats):
+        rows = math.ceil(total_seats / len(DEFAULT_LETTERS))
+        return cls(rows, seat_count=total_seats)
+
+    def index(self, label):
+        """Returns the bit index for a label like '12C', or None if it is not a seat."""
+        if not isinstance(label, str) or len(label) < 2:
+            return None
+        row_part, letter = label[:-1], label[-1].upper()
+        if not row_part.isdigit() or letter not in self.letters:
+            return None
+        row = int(row_part)
+        if not 1 <= row <= self.rows:
+            return None
+        idx = (row - 1) * len(self.letters) + self.letters.index(letter)
+        return idx if idx < self.seat_count else None
+
+    def label(self, idx):
+        row, pos = divmod(idx, len(self.letters))
+        return f"{row + 1}{self.letters[pos]}"
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "letters": self.letters,
+            "aisles": list(self.aisles),
+            "seat_count": self.seat_count,
+        }
+
+
+class SeatMap:
+    """
+    Seat availability for one flight as a bitset (bit set = seat taken).
+    Bit i lives in byte i // 8 at position i % 8 (least significant bit first).
+    """
+
+    def __init__(self, flight_id, layout, bits=None, version=0):
+        self.flight_id = flight_id
+        self.layout = layout
+        self.bits = bytearray(bits) if bits else bytearray((layout.seat_count + 7) // 8)
+        self.version = version
+        # Version of the flight_seat_map row this map was read from (None: no row yet)
+        self.base_version = version
+        self._changes = deque(maxlen=MAX_TRACKED_CHANGES)  # (version, index, taken)
+        self._lock = threading.Lock()
+
+    def copy(self):
+        """Independent copy (with change history) for one transaction to modify."""
+        with self._lock:
+            clone = SeatMap(self.flight_id, self.layout, self.bits, self.version)
+            clone.base_version = self.base_version
+            clone._changes.extend(self._changes)
+        return clone
+
+    @property
+    def modified(self):
+        return self.version != self.base_version
+
+    def _is_set(self, idx):
+        return (self.bits[idx >> 3] >> (idx & 7)) & 1 == 1
+
+    def _set(self, idx, taken):
+        if taken:
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+        else:
+            self.bits[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+        self.version += 1
+        self._changes.append((self.version, idx, taken))
+
+    def is_valid(self, label):
+        return self.layout.index(label) is not None
+
+    def is_taken(self, label):
+        idx = self.layout.index(label)
+        return idx is not None and self._is_set(idx)
+
+    def take(self, label):
+        """Marks a seat taken. Returns False if the seat is invalid or already taken."""
+        idx = self.layout.index(label)
+        if idx is None:
+            return False
+        with self._lock:
+            if self._is_set(idx):
+                return False
+            self._set(idx, True)
+        return True
+
+    def take_all(self, labels):
+        """Takes every seat in `labels` or none of them. Returns True on success."""
+        indexes = [self.layout.index(label) for label in labels]
+        if None in indexes or len(set(indexes)) != len(indexes):
+            return False
+        with self._lock:
+            if any(self._is_set(idx) for idx in indexes):
+                return False
+            for idx in indexes:
+                self._set(idx, True)
+        return True
+
+    def release(self, label):
+        idx = self.layout.index(label)
+        if idx is None:
+            return
+        with self._lock:
+            if self._is_set(idx):
+                self._set(idx, False)
+
+    @property
+    def taken_count(self):
+        return sum(bin(b).count('1') for b in self.bits)
+
+    def free_seats(self):
+        return [self.layout.label(i) for i in range(self.layout.seat_count) if not self._is_set(i)]
+
+    def find_adjacent(self, count):
+        """
+        Finds `count` free seats side by side in one row, preferring blocks that
+        do not cross an aisle. Returns a list of labels or None.
+        """
+        width = len(self.layout.letters)
+        if count < 1 or count > width:
+            return None
+
+        edges = (0,) + self.layout.aisles + (width,)
+        blocks = [(edges[i], edges[i + 1]) for i in range(len(edges) - 1)]
+
+        for segments in (blocks, [(0, width)]):
+            for row in range(self.layout.rows):
+                row_start = row * width
+                for seg_start, seg_end in segments:
+                    run = 0
+                    for pos in range(seg_start, seg_end):
+                        idx = row_start + pos
+                        if idx >= self.layout.seat_count or self._is_set(idx):
+                            run = 0
+                            continue
+                        run += 1
+                        if run == count:
+                            return [self.layout.label(i) for i in range(idx - count + 1, idx + 1)]
+        return None
+
+    def changes_since(self, version):
+        """Seat changes after `version`, or None if they are no longer tracked."""
+        if version == self.version:
+            return []
+        if not self._changes or self._changes[0][0] > version + 1 or version > self.version:
+            return None
+        return [
+            {"seat": self.layout.label(idx), "taken": taken}
+            for v, idx, taken in self._changes if v > version
+        ]
+
+    def to_dict(self):
+        return {
+            "flight_id": self.flight_id,
+            "version": self.version,
+            "layout": self.layout.to_dict(),
+            "bitmap": base64.b64encode(bytes(self.bits)).decode('ascii'),
+            "seats_taken": self.taken_count,
+        }
+
+
+class SeatMapStore:
+    """
+    The flight_seat_map table is the source of truth for seat assignments.
+    Maps kept here are a read cache for the seat map endpoint.
+
+    Writers never touch cached maps. Inside their transaction they take a
+    private copy with checkout(), change it, and call save(). save() writes
+    it with a compare-and-set on the row's version. If another transaction
+    (or worker process) changed the row in the meantime, save() raises
+    StaleDataError and the caller rolls back and retries
+    (see concurrency.retry_on_conflict). After a successful commit,
+    publish() makes the new map the cached copy.
+    """
+
+    def __init__(self):
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, flight_id):
+        with self._lock:
+            return self._maps.get(flight_id)
+
+    def _committed_version(self, flight_id):
+        return db.session.execute(
+            db.select(FlightSeatMap.version).where(FlightSeatMap.flight_id == flight_id)
+        ).scalar()
+
+    def get(self, flight):
+        """Read-only map for display, reloaded when the committed version has moved on."""
+        version = self._committed_version(flight.id)
+        cached = self._cached(flight.id)
+        if cached is not None and cached.base_version == version:
+            return cached
+
+        seat_map = self._load(flight)
+        with self._lock:
+            current = self._maps.get(flight.id)
+            if current is None or current.base_version != seat_map.base_version:
+                self._maps[flight.id] = current = seat_map
+            return current
+
+    def checkout(self, flight):
+        """A private copy of the committed map, for one transaction to change and save()."""
+        version = self._committed_version(flight.id)
+        cached = self._cached(flight.id)
+        if cached is not None and cached.base_version == version:
+            return cached.copy()
+        return self._load(flight)
+
+    def _load(self, flight):
+        layout = CabinLayout.for_total_seats(flight.total_seats)
+        record = db.session.execute(
+            db.select(FlightSeatMap.bitmap, FlightSeatMap.version).where(FlightSeatMap.flight_id == flight.id)
+        ).first()
+        if record is not None:
+            return SeatMap(flight.id, layout, record.bitmap, record.version)
+
+        # No row yet: build the map from seats held by confirmed bookings.
+        # save() inserts the row.
+        seat_map = SeatMap(flight.id, layout)
+        confirmed = Booking.query.filter_by(flight_id=flight.id, status='CONFIRMED').all()
+        for booking in confirmed:
+            seat_map.take(booking.seat_number)
+        seat_map.version = 0
+        seat_map.base_version = None
+        seat_map._changes.clear()
+        return seat_map
+
+    def save(self, seat_map):
+        """
+        Writes a checked-out map in the caller's transaction (commit is the
+        caller's). Raises StaleDataError if the map changed since checkout.
+        """
+        if not seat_map.modified:
+            return
+        table = FlightSeatMap.__table__
+        if seat_map.base_version is None:
+            try:
+                db.session.execute(table.insert().values(
+                    flight_id=seat_map.flight_id, bitmap=bytes(seat_map.bits), version=seat_map.version
+                ))
+            except IntegrityError:
+                raise StaleDataError(f"Seat map for flight {seat_map.flight_id} was created concurrently")
+            return
+
+        result = db.session.execute(
+            table.update()
+            .where(table.c.flight_id == seat_map.flight_id, table.c.version == seat_map.base_version)
+            .values(bitmap=bytes(seat_map.bits), version=seat_map.version)
+        )
+        if result.rowcount != 1:
+            raise StaleDataError(f"Seat map for flight {seat_map.flight_id} changed concurrently")
+
+    def publish(self, seat_map):
+        """Call after commit: caches the saved map unless a newer one is already cached."""
+        seat_map.base_version = seat_map.version
+        with self._lock:
+            cached = self._maps.get(seat_map.flight_id)
+            if cached is None or cached.base_version is None or cached.base_version < seat_map.version:
+                self._maps[seat_map.flight_id] = seat_map
+
+    def evict(self, flight_id):
+        with self._lock:
+            self._maps.pop(flight_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._maps.clear()
+
+
+seat_maps = SeatMapStore()
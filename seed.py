@@ -1,10 +1,14 @@
-from app import app, db, Flight
+from core import create_core_app, db, Flight, FlightSeatMap, add_missing_columns
+from seatmap import seat_maps
 from datetime import datetime, timedelta
 
 # This function will create our sample data
 def seed_data():
     print("Deleting old data...")
-    # Clear out any old data
+    # Clear out any old data. Seat maps go first: without AUTOINCREMENT on older
+    # databases, new flights can reuse old ids and would inherit their seats.
+    FlightSeatMap.query.delete()
+    seat_maps.clear()
     Flight.query.delete()
 
     print("Creating new flight data...")
@@ -64,5 +68,8 @@ def seed_data():
 if __name__ == '__main__':
     # We need to run this 'with' block
     # to make sure our script can talk to the app and database
+    app = create_core_app()
     with app.app_context():
+        db.create_all()
+        add_missing_columns(db.engine)
         seed_data()
\ No newline at end of file
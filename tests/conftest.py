@@ -0,0 +1,37 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from core import configure_database  # noqa: E402
+from models import db, Flight  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App bound to a throwaway SQLite file, with an app context pushed."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'flights.db'}"
+    configure_database(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def flight(app):
+    flight = Flight(
+        flight_number='AI101', origin='DEL', destination='BOM',
+        departure_time=datetime.now() + timedelta(days=10),
+        arrival_time=datetime.now() + timedelta(days=10, hours=2),
+        base_price=100.0, total_seats=150, seats_available=150,
+    )
+    db.session.add(flight)
+    db.session.commit()
+    return flight
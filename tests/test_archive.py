@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+
+from archive import archive_departed_flights, find_archived_booking, partition_for
+from models import db, Flight, Booking, User
+
+
+def departed_flight(user, pnr, days_ago):
+    departure = datetime.now() - timedelta(days=days_ago)
+    flight = Flight(
+        flight_number='AI202', origin='DEL', destination='BOM',
+        departure_time=departure, arrival_time=departure + timedelta(hours=2),
+        base_price=100.0, total_seats=150, seats_available=149,
+    )
+    db.session.add(flight)
+    db.session.flush()
+    db.session.add(Booking(user_id=user.id, flight_id=flight.id, passenger_name='P', passenger_email='p@example.com',
+                           pnr=pnr, seat_number='1A', price_paid=1000.0))
+    db.session.commit()
+    return flight
+
+
+def test_reused_flight_number_keeps_both_archived_flights(app, tmp_path):
+    app.config['ARCHIVE_DIR'] = str(tmp_path / 'archive')
+    user = User(name='P', email='p@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    # The flight number is unique among live flights, so it is reused only after archiving
+    departed_flight(user, 'AAAAAA', days_ago=3)
+    archive_departed_flights(older_than_days=1)
+    departed_flight(user, 'BBBBBB', days_ago=2)
+    archive_departed_flights(older_than_days=1)
+
+    for pnr in ('AAAAAA', 'BBBBBB'):
+        booking = find_archived_booking(pnr, user.id)
+        assert booking is not None and booking.flight.flight_number == 'AI202'
+    assert find_archived_booking('AAAAAA', user.id).flight_id != find_archived_booking('BBBBBB', user.id).flight_id
+
+
+def test_legacy_archive_file_loses_unique_constraints(app, tmp_path):
+    app.config['ARCHIVE_DIR'] = str(tmp_path / 'archive')
+    user = User(name='P', email='p@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    # An archive file created with the hot tables' schema, UNIQUE flight_number included
+    partition = partition_for(datetime.now() - timedelta(days=3))
+    (tmp_path / 'archive').mkdir()
+    legacy = create_engine(f"sqlite:///{tmp_path / 'archive' / ('flights_' + partition.replace('-', '_') + '.db')}")
+    db.metadata.create_all(legacy, tables=[Flight.__table__, Booking.__table__])
+    legacy.dispose()
+
+    departed_flight(user, 'AAAAAA', days_ago=3)
+    archive_departed_flights(older_than_days=1)
+    departed_flight(user, 'BBBBBB', days_ago=3)
+    archive_departed_flights(older_than_days=1)
+
+    assert find_archived_booking('AAAAAA', user.id) is not None
+    assert find_archived_booking('BBBBBB', user.id) is not None
@@ -0,0 +1,31 @@
+from changelog import read_events
+from models import db, Booking, User
+
+
+def book(flight, user, pnrs):
+    flight.seats_available -= len(pnrs)
+    db.session.add_all([
+        Booking(user_id=user.id, flight_id=flight.id, passenger_name='P', passenger_email='p@example.com',
+                pnr=pnr, seat_number=f"{i + 1}A", price_paid=1000.0)
+        for i, pnr in enumerate(pnrs)
+    ])
+    db.session.commit()
+
+
+def test_seats_delta_sums_to_net_inventory_change(flight):
+    user = User(name='P', email='p@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    _, after = read_events()
+
+    book(flight, user, ['AAAAAA', 'BBBBBB', 'CCCCCC'])
+    booking = Booking.query.filter_by(pnr='BBBBBB').one()
+    booking.status = 'CANCELLED'
+    flight.seats_available += 1
+    db.session.commit()
+
+    events, _ = read_events(after)
+    assert [e['event_type'] for e in events].count('booking_created') == 3
+    assert [e['event_type'] for e in events].count('booking_cancelled') == 1
+    assert sum(e['seats_delta'] for e in events) == -2
+    assert all(e['seats_delta'] == 0 for e in events if e['event_type'] != 'inventory_changed')
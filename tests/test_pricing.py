@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models import Flight
+from overbooking import authorized_capacity
+from pricing import calculate_dynamic_price, calculate_dynamic_prices, reference_fares
+
+
+def make_flight(base_price, total_seats, seats_available, days_out):
+    departure = datetime.now() + timedelta(days=days_out, hours=12)  # Away from day boundaries
+    return Flight(
+        flight_number='T1', origin='DEL', destination='BOM',
+        departure_time=departure, arrival_time=departure + timedelta(hours=2),
+        base_price=base_price, total_seats=total_seats, seats_available=seats_available,
+    )
+
+
+@pytest.mark.parametrize('days_out', [0, 1, 2, 5, 6, 7, 20, 29, 30, 90])
+def test_vectorized_prices_match_scalar(days_out):
+    flights = [
+        make_flight(base_price, 150, seats_available, days_out)
+        for base_price in (99.99, 250.0, 412.37)
+        for seats_available in (150, 100, 37, 1, 0, -5)
+    ]
+    scalar = [calculate_dynamic_price(f)['final_price_inr'] for f in flights]
+
+    vectorized = calculate_dynamic_prices(
+        np.array([f.base_price for f in flights]),
+        np.array([f.total_seats - f.seats_available for f in flights]),
+        np.array([authorized_capacity(f) for f in flights]),
+        np.array([(f.departure_time - datetime.now()).days for f in flights]),
+    )
+    assert vectorized.tolist() == scalar
+
+
+def test_reference_fare_matches_breakdown_without_surcharges():
+    flight = make_flight(250.0, 150, 150, 90)  # Empty flight far out: no dynamic surcharges
+    breakdown = calculate_dynamic_price(flight)
+    assert breakdown['surcharges']['occupancy_surcharge'] == 0
+    assert breakdown['surcharges']['date_proximity_surcharge'] == 0
+    assert reference_fares([250.0]).tolist() == [breakdown['final_price_inr']]
@@ -0,0 +1,32 @@
+import sqlite3
+
+from ratelimit import MemoryBucketStore, RateLimiter
+
+
+def test_refilled_buckets_are_pruned():
+    store = MemoryBucketStore(prune_interval=0.0)
+    for i in range(100):
+        store.consume(f"search:ip:{i}", 5.0, 20, now=0.0)
+    assert len(store) == 100
+
+    # One token refills in 0.2 s, after which each bucket is back at its burst
+    store.consume('search:ip:new', 5.0, 20, now=1.0)
+    assert len(store) == 1
+
+
+def test_bucket_count_is_capped():
+    store = MemoryBucketStore(max_buckets=10)
+    for i in range(50):
+        store.consume(f"search:ip:{i}", 5.0, 20, now=0.0)
+    assert len(store) == 10
+
+
+def test_store_errors_fail_open():
+    class LockedStore:
+        def consume(self, key, rate, burst, now):
+            raise sqlite3.OperationalError('database is locked')
+
+    limiter = RateLimiter()
+    limiter.store = LockedStore()
+    assert limiter.check('search', 'ip:127.0.0.1') == (True, 0.0)
+    assert limiter.stats()['counters'] == {'search': {'store_error': 1}}
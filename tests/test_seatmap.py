@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from models import db, FlightSeatMap
+from seatmap import CabinLayout, SeatMap, SeatMapStore
+
+
+def stored_map(flight):
+    """Seat map as committed in the database."""
+    db.session.expire_all()
+    record = db.session.get(FlightSeatMap, flight.id)
+    return SeatMap(flight.id, CabinLayout.for_total_seats(flight.total_seats), record.bitmap, record.version)
+
+
+def test_take_and_release():
+    seat_map = SeatMap(1, CabinLayout.for_total_seats(150))
+    assert seat_map.take('1A')
+    assert not seat_map.take('1A')
+    assert not seat_map.take('26A')  # Row 26 does not exist on a 150-seat cabin
+    assert seat_map.is_taken('1A')
+    seat_map.release('1A')
+    assert not seat_map.is_taken('1A')
+    assert seat_map.changes_since(0) == [{"seat": "1A", "taken": True}, {"seat": "1A", "taken": False}]
+
+
+def test_non_string_labels_are_not_seats():
+    layout = CabinLayout.for_total_seats(150)
+    assert layout.index(12) is None
+    assert layout.index(None) is None
+    assert layout.index(['1A']) is None
+
+
+def test_take_all_is_all_or_nothing():
+    seat_map = SeatMap(1, CabinLayout.for_total_seats(150))
+    seat_map.take('1B')
+    assert not seat_map.take_all(['1A', '1B', '1C'])
+    assert not seat_map.is_taken('1A') and not seat_map.is_taken('1C')
+
+
+def test_saved_map_is_persisted_and_cached(flight):
+    store = SeatMapStore()
+    seat_map = store.checkout(flight)
+    seat_map.take('1A')
+    store.save(seat_map)
+    db.session.commit()
+    store.publish(seat_map)
+
+    assert stored_map(flight).is_taken('1A')
+    assert store.get(flight).is_taken('1A')
+
+
+def test_checkout_does_not_touch_the_cache(flight):
+    store = SeatMapStore()
+    cached = store.get(flight)
+    seat_map = store.checkout(flight)
+    seat_map.take('1A')
+    assert not cached.is_taken('1A')
+    assert not store.get(flight).is_taken('1A')
+
+
+def test_rolled_back_seat_is_not_persisted_by_another_commit(flight):
+    store = SeatMapStore()
+    first = store.checkout(flight)
+    first.take('1A')
+    store.save(first)
+    db.session.commit()
+    store.publish(first)
+
+    # Request B takes 2A but has not committed when request A commits 3A.
+    request_b = store.checkout(flight)
+    request_b.take('2A')
+    request_a = store.checkout(flight)
+    request_a.take('3A')
+    store.save(request_a)
+    db.session.commit()
+    store.publish(request_a)
+    db.session.rollback()  # Request B gives up
+
+    committed = stored_map(flight)
+    assert committed.is_taken('3A') and not committed.is_taken('2A')
+    assert not store.get(flight).is_taken('2A')
+
+
+def test_concurrent_save_conflicts_and_retry_sees_committed_seat(flight):
+    store = SeatMapStore()
+    first = store.checkout(flight)
+    first.take('1A')
+    store.save(first)
+    db.session.commit()
+
+    a = store.checkout(flight)
+    b = store.checkout(flight)
+    a.take('2A')
+    b.take('2A')
+    store.save(a)
+    db.session.commit()
+    store.publish(a)
+
+    with pytest.raises(StaleDataError):
+        store.save(b)
+    db.session.rollback()
+
+    retry = store.checkout(flight)
+    assert not retry.take('2A')  # The seat sold by A is visible to the retry
+
+
+def test_concurrent_first_save_conflicts(flight):
+    store = SeatMapStore()
+    a = store.checkout(flight)
+    b = store.checkout(flight)
+    a.take('1A')
+    b.take('1B')
+    store.save(a)
+    db.session.commit()
+    with pytest.raises(StaleDataError):
+        store.save(b)
+    db.session.rollback()
+
+
+def test_other_worker_commit_refreshes_cache(flight):
+    ours, other_worker = SeatMapStore(), SeatMapStore()
+    assert not ours.get(flight).is_taken('5C')
+
+    seat_map = other_worker.checkout(flight)
+    seat_map.take('5C')
+    other_worker.save(seat_map)
+    db.session.commit()
+    other_worker.publish(seat_map)
+
+    assert ours.get(flight).is_taken('5C')